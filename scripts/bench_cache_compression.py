@@ -0,0 +1,64 @@
+"""
+Compare cache file size and load time with and without compression.
+
+Usage: python -m scripts.bench_cache_compression [--copies N] [--repeat N]
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import timeit
+from pathlib import Path
+
+from pypistats import _cache
+from tests.data.python_minor import DATA
+
+
+def payload(copies: int) -> dict:
+    """A python_minor response, made bigger like one for a popular package"""
+    data = [
+        {**row, "category": f"{row['category']}.{i}"}
+        for i in range(copies)
+        for row in DATA
+    ]
+    return {"data": data, "package": "pillow", "type": "python_minor_downloads"}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--copies", type=int, default=10, help="Payload multiplier")
+    parser.add_argument("--repeat", type=int, default=20, help="Loads to time")
+    args = parser.parse_args()
+
+    data = payload(args.copies)
+    print(f"{len(data['data']):,} rows\n")
+    print(f"{'compression':<12} {'bytes':>12} {'ratio':>7} {'load ms':>9}")
+
+    plain_size = None
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for compression, suffix in _cache.COMPRESSIONS.items():
+            if compression == "zstd":
+                try:
+                    _cache._zstd()
+                except ImportError:
+                    print(f"{compression:<12} (not available)")
+                    continue
+
+            cache_file = Path(temp_dir) / f"bench{suffix}"
+            _cache.save(cache_file, data)
+            size = cache_file.stat().st_size
+            plain_size = plain_size or size
+
+            seconds = timeit.timeit(lambda: _cache.load(cache_file), number=args.repeat)
+            print(
+                f"{compression or 'none':<12} {size:>12,} {plain_size / size:>6.1f}x "
+                f"{seconds / args.repeat * 1000:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
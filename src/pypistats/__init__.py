@@ -6,13 +6,21 @@ https://pypistats.org/api
 from __future__ import annotations
 
 import sys
+from typing import NamedTuple
 
-from . import _version
+from . import _http, _version
+from ._http import Client as Client
+from ._http import RateLimiter as RateLimiter
 
 TYPE_CHECKING = False
 if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator, Sequence
     from typing import Any
 
+    from . import _cache, _indexed
+    from ._cache import CacheInfo
+    from ._pipeline import Stage
+
 __version__ = _version.__version__
 
 BASE_URL = "https://pypistats.org/api/"
@@ -28,7 +36,14 @@ def _print_verbose(*args: Any, **kwargs: Any) -> None:
 
 
 def _validate_total(total: str) -> None:
-    supported_granularities = ("daily", "monthly", "all")
+    supported_granularities = (
+        "daily",
+        "weekly",
+        "monthly",
+        "quarterly",
+        "yearly",
+        "all",
+    )
     if total not in supported_granularities:
         msg = f"total must be one of {supported_granularities}"
         raise ValueError(msg)
@@ -43,57 +58,354 @@ def pypi_stats_api(
     sort: bool | str = True,
     total: str = "all",
     color: str = "yes",
+    client: _http.Client | None = None,
+    history: bool = False,
+    stream: bool = False,
+    stages: Sequence[Stage] = (),
 ):
-    """Call the API and return JSON"""
+    """Call the API and return JSON.
+
+    Pass a Client to reuse its connection pool across many calls,
+    otherwise a shared default client is used.
+
+    With history, rows from earlier calls are kept and included, so dates can be
+    older than the 180 days the API has.
+
+    With stream, a response that isn't already cached is filtered and totalled
+    as it's read, so memory use depends on the output rather than the size of the
+    response. It isn't cached, and can't be used with history.
+
+    Stages are extra steps for the rows of time series, run after filtering and
+    totalling, and before percentages, sorting and formatting. Each is a callable
+    taking an iterable of row dicts and returning an iterable of row dicts, and can
+    be a generator to work on them one at a time.
+    """
     _validate_total(total)
-    if format == "md":
-        format = "markdown"
+    if stream:
+        if history:
+            msg = "stream can't be used with history"
+            raise ValueError(msg)
+
+        url = _url(endpoint, params)
+        cached = _load_cache(endpoint, url)
+        if cached is None:
+            return _process_stream(
+                url, client, format, start_date, end_date, sort, total, color, stages
+            )
+        res = _copy(cached)
+    else:
+        res = _copy(_fetch(endpoint, params, client, history))
+    return _process(
+        res, format, start_date, end_date, sort, total, color, stages=stages
+    )
+
+
+def _fetch(
+    endpoint: str,
+    params: str | None = None,
+    client: _http.Client | None = None,
+    history: bool = False,
+) -> dict:
+    """Return the raw JSON for the endpoint, from the cache or the API,
+    merged with the history if asked for.
+    It may be shared with the cache, so copy it before changing it."""
+    url = _url(endpoint, params)
+    res = _load_cache(endpoint, url)
+
+    if res is None:
+        # No cache, or couldn't load cache
+        res = _fetch_once(url, lambda: _revalidate(url, client))
+
+    if history:
+        from . import _history
+
+        res = _history.merge(url, res)
+
+    return res
+
+
+def _fetch_once(url: str, fetch: Callable[[], tuple[dict, int, dict | None]]) -> dict:
+    """Call fetch for the JSON for url, its size in bytes and its validators, and
+    cache them. Threads fetching the same url at the same time share one fetch.
+    With locking, if another process sharing the cache is already fetching url,
+    wait for it and use what it cached instead."""
+    from . import _cache
+
+    def fetch_and_save() -> dict:
+        with _cache.lock(url):
+            if _cache.LOCKING:
+                cached = _cache.lookup(url)
+                if cached is not None:
+                    _print_verbose("Fetched by another process")
+                    res, nbytes = cached
+                    _cache.memory.set(url, res, nbytes)
+                    return res
+
+            res, nbytes, validators = fetch()
+            _save_cache(url, res, nbytes, validators)
+        return res
+
+    return _cache.in_flight.do(url, fetch_and_save)
+
+
+def _revalidate(url: str, client: _http.Client | None = None) -> tuple[dict, int, dict]:
+    """Return the JSON from the API, its size in bytes and its validators.
+    If there's an earlier response for the URL, reuse it while it's still fresh,
+    or ask the API to send the JSON only if it has changed since."""
+    import json
+
+    from . import _cache
+
+    previous = _cache.backend.get_previous(url)
+    if previous:
+        previous_data = previous.pop("data")
+        previous_nbytes = previous.pop("nbytes")
+        if _cache.is_fresh(previous):
+            _print_verbose("Earlier response still fresh")
+            return previous_data, previous_nbytes, previous
+
+    if client is None:
+        client = _http.default_client()
+    r = client.get(url, headers=_cache.conditional_headers(previous))
+
+    if r.status == 304 and previous:
+        _print_verbose("HTTP status code:", r.status)
+        _print_verbose("Earlier response not modified")
+        validators = _cache.validators_from_headers(r.headers, previous)
+        return previous_data, previous_nbytes, validators
+
+    _raise_for_status(r.status, url)
+    validators = _cache.validators_from_headers(r.headers)
+    return json.loads(r.data), len(r.data), validators
+
+
+def _get_json(url: str, client: _http.Client | None = None) -> tuple[dict, int]:
+    """Return the JSON from the API and its size in bytes, bypassing the cache"""
+    import json
+
+    if client is None:
+        client = _http.default_client()
+    r = client.get(url)
+    _raise_for_status(r.status, url)
+
+    return json.loads(r.data), len(r.data)
+
+
+def _copy(res: dict) -> dict:
+    """Return a copy of the JSON safe to process, without a slow deep copy.
+    Rows are flat, so copying each row is enough."""
+    data = res.get("data")
+    if isinstance(data, list):
+        data = [dict(row) for row in data]
+    elif isinstance(data, dict):
+        data = dict(data)
+    return {**res, "data": data}
+
+
+def _url(endpoint: str, params: str | None = None) -> str:
+    """Return the API URL for the endpoint and params"""
     if params:
         params = "?" + params
     else:
         params = ""
-    url = BASE_URL + endpoint.lower() + params
+    return BASE_URL + endpoint.lower() + params
+
 
+def _load_cache(endpoint: str, url: str) -> dict | None:
+    """Return cached data from memory or the cache backend,
+    or None if there's no cache or it couldn't be loaded"""
     from . import _cache
 
-    cache_file = _cache.filename(url)
     if _verbose:
         package = endpoint.split("/")[1]
         human_url = f"https://pypistats.org/packages/{package}"
         _print_verbose(f"Human URL:\t{human_url}")
         _print_verbose(f"API URL:\t{url}")
-        _print_verbose(f"Cache file:\t{cache_file}")
 
-    res = {}
-    if cache_file.is_file():
-        _print_verbose("Cache file exists")
-        res = _cache.load(cache_file)
+    res = _cache.memory.get(url)
+    if res is not None:
+        _print_verbose("Memory cache hit")
+        return res
 
-    if res == {}:
-        # No cache, or couldn't load cache
-        import json
+    if _verbose:
+        _print_verbose(f"Cache file:\t{_cache.backend.location(url)}")
+    cached = _cache.lookup(url)
+    if cached is None:
+        return None
+
+    _print_verbose("Cache file exists")
+    res, nbytes = cached
+    _cache.memory.set(url, res, nbytes)
+    return res
+
+
+def _save_cache(
+    url: str, res: dict, nbytes: int, validators: dict | None = None
+) -> None:
+    """Save data to the cache backend and memory, and any validators to
+    revalidate it with once it's out of date"""
+    from . import _cache
 
-        import urllib3
+    _cache.store(url, res, validators)
+    _cache.memory.set(url, res, nbytes)
 
-        r = urllib3.request("GET", url, headers={"User-Agent": USER_AGENT})
 
-        # Raise if we made a bad request
-        # (4XX client error or 5XX server error response)
-        _print_verbose("HTTP status code:", r.status)
-        if r.status >= 400:
-            msg = f"HTTP Error {r.status} for url: {url}"
-            raise urllib3.exceptions.HTTPError(msg)
+def _raise_for_status(status: int, url: str) -> None:
+    """Raise if we made a bad request
+    (4XX client error or 5XX server error response)"""
+    _print_verbose("HTTP status code:", status)
+    if status >= 400:
+        import urllib3
+
+        msg = f"HTTP Error {status} for url: {url}"
+        raise urllib3.exceptions.HTTPError(msg)
 
-        res = json.loads(r.data.decode("utf-8"))
 
-        _cache.save(cache_file, res)
+def _process(
+    res: dict,
+    format: str | None = "pretty",
+    start_date: str | None = None,
+    end_date: str | None = None,
+    sort: bool | str = True,
+    total: str = "all",
+    color: str = "yes",
+    stacklevel: int = 4,
+    *,
+    stages: Sequence[Stage] = (),
+    indexed: _indexed.Rows | None = None,
+):
+    """Filter, total and format the JSON returned by the API.
 
+    indexed is its rows, already indexed to reuse. They're shared, so only copied
+    if kept as they are."""
     if not res.get("data", []):
         return f"No data found for https://pypi.org/project/{res.get('package', '')}/"
 
-    # Actual first and last dates of the fetched data
-    first, last = _date_range(res["data"])
+    # Rows grouped by category and sorted by date, as the API returns them,
+    # can be filtered by binary search
+    shared = indexed is not None
+    if indexed is None and isinstance(res["data"], list):
+        from . import _indexed
+
+        indexed = _indexed.Rows.from_rows(res["data"])
+
+    # Actual first and last dates of the fetched data, found while filtering and
+    # totalling if not indexed
+    first = last = None
+    if indexed is not None:
+        first, last = indexed.first, indexed.last
+
+    from . import _pipeline
+
+    grand_total = None
+    if isinstance(res["data"], list):
+        rows = res["data"]
+        pipeline: list[Stage] = []
+        dates: _pipeline.DateRange | _pipeline.Totals
+        totals = None
+        if indexed is not None:
+            rows = indexed.rows()
+            if start_date or end_date:
+                rows = indexed.filter(start_date, end_date).rows()
+            # Dates are known, and the totals are few enough for the grand total
+            # to be quick to find later
+            if total != "daily":
+                pipeline.append(_pipeline.total_periods(total))
+            elif shared:
+                rows = [dict(row) for row in rows]
+        elif total == "daily":
+            dates = _pipeline.DateRange()
+            pipeline += [dates, _pipeline.filter_dates(start_date, end_date)]
+        else:
+            # The date range, filtering and totals all in one pass
+            dates = totals = _pipeline.Totals(start_date, end_date, total)
+            pipeline.append(totals)
+        pipeline += stages
+        res["data"] = list(_pipeline.run(rows, pipeline)) if pipeline else rows
+
+        if indexed is None:
+            first, last = dates.first, dates.last
+        if totals is not None and not stages:
+            # Unless the custom stages change the rows
+            grand_total = totals.grand_total
+
+    _validate_dates(first, start_date, end_date, stacklevel + 1)
+
+    if start_date:
+        first = start_date
+    if end_date:
+        last = end_date
+
+    return _present(
+        res, format, first, last, sort, color, grand_total, _pipeline.columns(total)
+    )
+
+
+def _process_stream(
+    url: str,
+    client: _http.Client | None,
+    format: str | None,
+    start_date: str | None,
+    end_date: str | None,
+    sort: bool | str,
+    total: str,
+    color: str,
+    stages: Sequence[Stage] = (),
+):
+    """Fetch the JSON from the API, and filter, total and format it like _process,
+    but a row at a time as the response is read"""
+    from . import _pipeline, _stream
 
+    if client is None:
+        client = _http.default_client()
+    r = client.get(url, preload_content=False)
+    try:
+        _raise_for_status(r.status, url)
+        response = _stream.Response(r.stream(_stream.CHUNK_SIZE))
+        dates: _pipeline.DateRange | _pipeline.Totals
+        pipeline: list[Stage]
+        if total == "daily":
+            dates = _pipeline.DateRange()
+            pipeline = [dates, _pipeline.filter_dates(start_date, end_date)]
+        else:
+            dates = _pipeline.Totals(start_date, end_date, total)
+            pipeline = [dates]
+        data = list(_pipeline.run(response, [*pipeline, *stages]))
+    finally:
+        r.drain_conn()
+        r.release_conn()
+
+    res = response.fields
+    if res.get("data") is not None:
+        # Not a list of rows, like for recent
+        return _process(res, format, start_date, end_date, sort, total, color, 5)
+    if not response.nrows:
+        return f"No data found for https://pypi.org/project/{res.get('package', '')}/"
+
+    first, last = dates.first, dates.last
+    _validate_dates(first, start_date, end_date, 5)
+    res["data"] = data
+    if start_date:
+        first = start_date
+    if end_date:
+        last = end_date
+
+    grand_total = None
+    if isinstance(dates, _pipeline.Totals) and not stages:
+        grand_total = dates.grand_total
+    return _present(
+        res, format, first, last, sort, color, grand_total, _pipeline.columns(total)
+    )
+
+
+def _validate_dates(
+    first: str | None,
+    start_date: str | None,
+    end_date: str | None,
+    stacklevel: int,
+) -> None:
+    """Raise if the end date is before the first date of the data,
+    and warn if the start date is"""
     # Validate end date
     if end_date:
         assert first is not None
@@ -115,33 +427,54 @@ def pypi_stats_api(
                 f"Requested start date ({start_date}) is before earliest available "
                 f"data ({first}), because data is only available for 180 days. "
                 "See https://pypistats.org/about#data",
-                stacklevel=3,
+                stacklevel=stacklevel,
             )
 
-    if start_date or end_date:
-        res["data"] = _filter(res["data"], start_date, end_date)
 
-    if start_date:
-        first = start_date
-    if end_date:
-        last = end_date
-
-    if total == "monthly":
-        res["data"] = _monthly_total(res["data"])
-    elif total == "all":
-        res["data"] = _total(res["data"])
+def _present(
+    res: dict,
+    format: str | None,
+    first: str | None,
+    last: str | None,
+    sort: bool | str,
+    color: str,
+    grand_total: int | None = None,
+    names: Sequence[str] = (),
+):
+    """Format the filtered and totalled JSON, with the date range it covers.
+    grand_total is calculated from the data if not given. names are the columns
+    of the rows, for the typed formats when the dates filter out all of them."""
+    if format == "md":
+        format = "markdown"
 
     if format == "json":
         import json
 
         return json.dumps(res)
 
+    if format in ("arrow", "parquet"):
+        from . import _arrow
+
+        table = _arrow.table(res, names)
+        return table if format == "arrow" else _arrow.to_bytes(table, format)
+
+    if format in ("numpy-typed", "pandas-typed"):
+        # Typed columns, with percent calculated rather than formatted
+        data = res["data"]
+        if sort:
+            data = _sort(data, "downloads" if sort == "percent" else sort)
+        return _typed(data, format, grand_total, names)
+
     # These only for tables, like markdown and rst
     data = res["data"]
-    data = _percent(data)
+    if not isinstance(data, list) or len(data) <= 1:
+        grand_total = None
+    elif grand_total is None:
+        grand_total = _grand_total_value(data)
+    data = _percent(data, grand_total)
     if sort:
         data = _sort(data, sort)
-    data = _grand_total(data)
+    data = _grand_total(data, grand_total)
 
     if format is None:
         return data
@@ -159,21 +492,12 @@ def pypi_stats_api(
 
 def _filter(data, start_date=None, end_date=None):
     """Only return data with dates between start_date and end_date"""
-    temp_data = []
-    if start_date:
-        for row in data:
-            if "date" in row and row["date"] >= start_date:
-                temp_data.append(row)
-        data = temp_data
+    if not start_date and not end_date:
+        return data
 
-    temp_data = []
-    if end_date:
-        for row in data:
-            if "date" in row and row["date"] <= end_date:
-                temp_data.append(row)
-        data = temp_data
+    from . import _pipeline
 
-    return data
+    return list(_pipeline.filter_dates(start_date, end_date)(data))
 
 
 def _sort(data: dict | list, sort: bool | str = True) -> dict | list:
@@ -211,27 +535,9 @@ def _sort(data: dict | list, sort: bool | str = True) -> dict | list:
 
 def _monthly_total(data: list) -> list:
     """Sum all downloads per category, by month"""
+    from . import _pipeline
 
-    totalled: dict = {}
-    for row in data:
-        category = row["category"]
-        downloads = row["downloads"]
-        month = row["date"][:7]
-
-        if category in totalled:
-            if month in totalled[category]:
-                totalled[category][month] += downloads
-            else:
-                totalled[category][month] = downloads
-        else:
-            totalled[category] = {month: downloads}
-
-    data = []
-    for category, month_downloads in totalled.items():
-        for month, downloads in month_downloads.items():
-            data.append({"category": category, "date": month, "downloads": downloads})
-
-    return data
+    return list(_pipeline.total_monthly(data))
 
 
 def _total(data: dict | list) -> dict | list:
@@ -241,18 +547,9 @@ def _total(data: dict | list) -> dict | list:
     if isinstance(data, dict):
         return data
 
-    totalled: dict = {}
-    for row in data:
-        try:
-            totalled[row["category"]] += row["downloads"]
-        except KeyError:
-            totalled[row["category"]] = row["downloads"]
-
-    data = []
-    for k, v in totalled.items():
-        data.append({"category": k, "downloads": v})
+    from . import _pipeline
 
-    return data
+    return list(_pipeline.total_all(data))
 
 
 def _date_range(data: dict | list) -> tuple[str | None, str | None]:
@@ -271,24 +568,22 @@ def _date_range(data: dict | list) -> tuple[str | None, str | None]:
 def _grand_total_value(data: list) -> int:
     """Return the grand total of the data"""
 
-    # For "overall", without_mirrors is a subset of with_mirrors.
-    # Only sum with_mirrors.
+    from . import _pipeline
+
+    # For "overall", without_mirrors is a subset of with_mirrors,
+    # so sum each category in the same pass
     if data[0]["category"] in ["with_mirrors", "without_mirrors"]:
-        count_with_mirrors = sum(
-            row["downloads"] for row in data if row["category"] == "with_mirrors"
-        )
-        count_without_mirrors = sum(
-            row["downloads"] for row in data if row["category"] == "without_mirrors"
-        )
-        grand_total = max(count_with_mirrors, count_without_mirrors)
-    else:
-        grand_total = sum(row["downloads"] for row in data)
+        totals: dict = {}
+        for row in data:
+            category = row["category"]
+            totals[category] = totals.get(category, 0) + row["downloads"]
+        return _pipeline.grand_total(totals)
 
-    return grand_total
+    return sum(row["downloads"] for row in data)
 
 
-def _grand_total(data: dict | list) -> dict | list:
-    """Add a grand total row"""
+def _grand_total(data: dict | list, grand_total: int | None = None) -> dict | list:
+    """Add a grand total row, calculating it if not given"""
 
     # Only for lists of dicts, not a single dict
     if isinstance(data, dict):
@@ -298,7 +593,8 @@ def _grand_total(data: dict | list) -> dict | list:
     if len(data) == 1:
         return data
 
-    grand_total = _grand_total_value(data)
+    if grand_total is None:
+        grand_total = _grand_total_value(data)
 
     new_row = {"category": "Total", "downloads": grand_total}
     data.append(new_row)
@@ -306,8 +602,8 @@ def _grand_total(data: dict | list) -> dict | list:
     return data
 
 
-def _percent(data: dict | list) -> dict | list:
-    """Add a percent column"""
+def _percent(data: dict | list, grand_total: int | None = None) -> dict | list:
+    """Add a percent column, calculating the grand total if not given"""
 
     # Only for lists of dicts, not a single dict
     if isinstance(data, dict):
@@ -317,7 +613,8 @@ def _percent(data: dict | list) -> dict | list:
     if len(data) == 1:
         return data
 
-    grand_total = _grand_total_value(data)
+    if grand_total is None:
+        grand_total = _grand_total_value(data)
 
     for row in data:
         row["percent"] = "{:.2%}".format(row["downloads"] / grand_total)
@@ -433,6 +730,67 @@ def _dataframe(headers: list[str], data: dict | list, format_: str):
     return pandas.DataFrame(rows, columns=headers)
 
 
+def _typed(
+    data: dict | list,
+    format_: str,
+    grand_total: int | None = None,
+    names: Sequence[str] = (),
+):
+    """Return data as a NumPy structured array or pandas DataFrame with typed
+    columns: datetime64 dates, float percent, int64 downloads, and categorical
+    categories for pandas. There's no grand total row, it's the sum.
+    names are the columns when there's no data."""
+    import numpy
+
+    if isinstance(data, dict):
+        data = [data]
+
+    if data:
+        names = list(data[0])
+    headers = sorted(header for header in names if header != "downloads")
+    columns = {}
+    for header in headers:
+        values = [row[header] for row in data]
+        if header == "category":
+            if all(isinstance(value, str) for value in values):
+                columns[header] = numpy.array(values, dtype=str)
+            else:
+                columns[header] = numpy.array(values, dtype=object)
+        elif header == "date":
+            # Days, or months or years for those totals. NumPy has no weeks or
+            # quarters, so they're the day they start.
+            if values and ("-W" in values[0] or "-Q" in values[0]):
+                from . import _pipeline
+
+                values = [_pipeline.period_start(value) for value in values]
+            dtype = "datetime64" if values else "datetime64[D]"
+            columns[header] = numpy.array(values, dtype=dtype)
+        else:
+            columns[header] = numpy.array(values, dtype=numpy.int64)
+
+    if "downloads" in names:
+        downloads = numpy.array([row["downloads"] for row in data], dtype=numpy.int64)
+        if len(data) > 1:
+            if grand_total is None:
+                grand_total = _grand_total_value(data)
+            columns["percent"] = downloads / grand_total * 100
+        columns["downloads"] = downloads
+
+    if format_ == "numpy-typed":
+        array = numpy.empty(
+            len(data), dtype=[(name, column.dtype) for name, column in columns.items()]
+        )
+        for name, column in columns.items():
+            array[name] = column
+        return array
+
+    import pandas
+
+    if "category" in columns:
+        columns["category"] = pandas.Categorical(columns["category"])
+    return pandas.DataFrame(columns)
+
+
 def _paramify(param_name: str, param_value: float | str | None) -> str:
     """If param_value, return &param_name=param_value"""
     if isinstance(param_value, bool):
@@ -481,3 +839,299 @@ def system(package: str, os: str | None = None, **kwargs: Any):
     endpoint = f"packages/{package}/system"
     params = _paramify("os", os)
     return pypi_stats_api(endpoint, params, **kwargs)
+
+
+ENDPOINTS = ("recent", "overall", "python_major", "python_minor", "system")
+
+# The filter param each endpoint accepts
+ENDPOINT_PARAMS = {
+    "recent": "period",
+    "overall": "mirrors",
+    "python_major": "version",
+    "python_minor": "version",
+    "system": "os",
+}
+
+
+class PackageStats:
+    """Raw API data for one package and endpoint, fetched and parsed once.
+
+    Each view of it is computed on first use and then reused, so rendering many
+    views of the same package doesn't refetch or reparse anything. Views are
+    shared between callers, so copy one before changing it.
+    """
+
+    def __init__(self, res: dict) -> None:
+        self.raw = res
+        self._views: dict[tuple, Any] = {}
+        self._indexed: _indexed.Rows | None = None
+        if isinstance(res.get("data"), list):
+            from . import _indexed
+
+            # Once for all views
+            self._indexed = _indexed.Rows.from_rows(res["data"])
+
+    def __repr__(self) -> str:
+        return f"<PackageStats package={self.package!r} type={self.type!r}>"
+
+    @property
+    def package(self) -> str:
+        return self.raw.get("package", "")
+
+    @property
+    def type(self) -> str:
+        return self.raw.get("type", "")
+
+    def view(
+        self,
+        format: str | None = None,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        sort: bool | str = True,
+        total: str = "all",
+        color: str = "no",
+        stages: Sequence[Stage] = (),
+    ):
+        """Return the data filtered, totalled, sorted and formatted as for
+        pypi_stats_api, computing it only the first time it's asked for"""
+        _validate_total(total)
+        key = (format, start_date, end_date, sort, total, color, tuple(stages))
+        if key not in self._views:
+            # Indexed rows are copied as needed while processing
+            res = {**self.raw} if self._indexed is not None else _copy(self.raw)
+            self._views[key] = _process(
+                res,
+                format,
+                start_date,
+                end_date,
+                sort,
+                total,
+                color,
+                stacklevel=3,
+                stages=stages,
+                indexed=self._indexed,
+            )
+        return self._views[key]
+
+    @property
+    def daily(self):
+        """Daily downloads per category, with percentages"""
+        return self.view(total="daily")
+
+    @property
+    def monthly(self):
+        """Monthly downloads per category, with percentages"""
+        return self.view(total="monthly")
+
+    @property
+    def all_time(self):
+        """All downloads per category, with percentages"""
+        return self.view(total="all")
+
+
+def load(
+    package: str,
+    endpoint: str = "overall",
+    client: _http.Client | None = None,
+    history: bool = False,
+    **kwargs: Any,
+) -> PackageStats:
+    """Fetch the endpoint's data for a package once, to derive many views from.
+
+    The endpoint's own filter can be given as a keyword argument,
+    for example load("pillow", "python_minor", version="3.12").
+    With history, rows from earlier fetches are included.
+    """
+    if endpoint not in ENDPOINTS:
+        msg = f"endpoint must be one of {ENDPOINTS}"
+        raise ValueError(msg)
+
+    param_name = ENDPOINT_PARAMS[endpoint]
+    unexpected = set(kwargs) - {param_name}
+    if unexpected:
+        msg = f"{endpoint} only accepts {param_name!r}, not {sorted(unexpected)}"
+        raise TypeError(msg)
+
+    params = _paramify(param_name, kwargs.get(param_name))
+    return PackageStats(
+        _fetch(f"packages/{package}/{endpoint}", params, client, history)
+    )
+
+
+class FetchResult(NamedTuple):
+    """Outcome of fetching one package in a batch"""
+
+    package: str
+    result: Any
+    error: Exception | None = None
+
+
+def fetch_many(
+    packages: Iterable[str],
+    endpoint: str = "overall",
+    workers: int = 8,
+    client: _http.Client | None = None,
+    **kwargs: Any,
+) -> Iterator[FetchResult]:
+    """Fetch many packages concurrently from the same endpoint, yielding results
+    as they complete.
+
+    Up to `workers` requests run at once, sharing one connection pool and the cache.
+    Other keyword arguments are passed to each endpoint call. An error for one
+    package is captured in its result instead of aborting the batch.
+    """
+    if endpoint not in ENDPOINTS:
+        msg = f"endpoint must be one of {ENDPOINTS}"
+        raise ValueError(msg)
+    if workers < 1:
+        msg = "workers must be at least 1"
+        raise ValueError(msg)
+
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    func = globals()[endpoint]
+    own_client = client is None
+    if client is None:
+        client = _http.Client(maxsize=workers)
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {
+            executor.submit(func, package, client=client, **kwargs): package
+            for package in packages
+        }
+        for future in as_completed(futures):
+            package = futures[future]
+            try:
+                yield FetchResult(package, future.result())
+            except Exception as e:
+                yield FetchResult(package, None, e)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        if own_client:
+            client.close()
+
+
+def bundle(
+    package: str, client: _http.Client | None = None, history: bool = False
+) -> dict[str, PackageStats]:
+    """Retrieve the data from all endpoints for a package, fetched concurrently
+    and cached together"""
+    url = _url(f"packages/{package}/all")
+    res = _load_cache(f"packages/{package}/all", url)
+
+    if res is None:
+        # No cache, or couldn't load cache
+        res = _fetch_once(url, lambda: _get_all(package, client))
+
+    if history:
+        from . import _history
+
+        res = {
+            endpoint: _history.merge(_url(f"packages/{package}/{endpoint}"), data)
+            for endpoint, data in res.items()
+        }
+
+    return {endpoint: PackageStats(res[endpoint]) for endpoint in ENDPOINTS}
+
+
+def _get_all(
+    package: str, client: _http.Client | None = None
+) -> tuple[dict, int, None]:
+    """Return the JSON from all endpoints for a package, fetched concurrently,
+    and its total size in bytes"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    if client is None:
+        client = _http.default_client()
+    urls = [_url(f"packages/{package}/{endpoint}") for endpoint in ENDPOINTS]
+    with ThreadPoolExecutor(max_workers=len(ENDPOINTS)) as executor:
+        results = list(executor.map(lambda url: _get_json(url, client), urls))
+    res = {endpoint: json for endpoint, (json, _) in zip(ENDPOINTS, results)}
+    return res, sum(nbytes for _, nbytes in results), None
+
+
+def cache_info() -> CacheInfo:
+    """Return hits, misses and current and maximum size of the in-memory cache"""
+    from . import _cache
+
+    return _cache.memory.info()
+
+
+def cache_clear() -> None:
+    """Empty the in-memory cache. Cache files are left as they are."""
+    from . import _cache
+
+    _cache.memory.clear()
+
+
+def configure_client(**kwargs: Any) -> None:
+    """Replace the client used by all calls not given their own, taking the same
+    arguments as Client. For example, to make at most 2 requests a second and
+    retry rate limited and server error responses up to 5 times:
+
+        pypistats.configure_client(rate=2, retries=5)
+    """
+    _http.configure_default_client(**kwargs)
+
+
+_UNSET: Any = object()
+
+
+def configure_cache(
+    *,
+    memory_maxsize: int | None = None,
+    memory_maxbytes: int | None = None,
+    compression: str | None = _UNSET,
+    backend: str | _cache.Backend | None = None,
+    max_bytes: int | None = _UNSET,
+    locking: bool | None = None,
+) -> None:
+    """Configure caching.
+
+    Args:
+        memory_maxsize: Most responses to keep in memory, 0 to disable
+        memory_maxbytes: Most bytes of JSON responses to keep in memory
+        compression: Compress new cache files with "gzip" or "zstd", or None to
+                     not compress them. Existing files can be read either way.
+                     zstd needs Python 3.14+ or the zstandard package.
+        backend: Where to cache responses: "json" for one file per response
+                 (the default), "sqlite" for a single SQLite database,
+                 or a Backend instance
+        max_bytes: Most bytes of responses to keep in the cache backend, or None
+                   for no limit. When the process exits, the least recently used
+                   are deleted to keep within it.
+        locking: Whether processes sharing the cache take turns to fetch the same
+                 URL, using lock files, so only the first fetches it from the API
+    """
+    from . import _cache
+
+    if isinstance(backend, str):
+        if backend not in _cache.BACKENDS:
+            msg = f"backend must be one of {tuple(_cache.BACKENDS)}"
+            raise ValueError(msg)
+        backend = _cache.BACKENDS[backend]()
+    if backend is not None:
+        _cache.backend = backend
+
+    if compression is not _UNSET:
+        if compression not in _cache.COMPRESSIONS:
+            msg = f"compression must be one of {tuple(_cache.COMPRESSIONS)}"
+            raise ValueError(msg)
+        if compression == "zstd":
+            # Fail now rather than on the first save
+            _cache._zstd()
+        _cache.COMPRESSION = compression
+
+    if locking is not None:
+        _cache.LOCKING = locking
+
+    if max_bytes is not _UNSET:
+        import atexit
+
+        _cache.MAX_BYTES = max_bytes
+        # Only once, however many times this is called
+        atexit.unregister(_cache.enforce_max_bytes)
+        atexit.register(_cache.enforce_max_bytes)
+
+    _cache.memory.resize(memory_maxsize, memory_maxbytes)
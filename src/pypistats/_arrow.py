@@ -0,0 +1,63 @@
+"""
+Apache Arrow tables and Parquet files of API responses, using pyarrow
+"""
+
+from __future__ import annotations
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from collections.abc import Sequence
+
+    import pyarrow
+
+FORMATS = ("arrow", "parquet")
+
+
+def table(res: dict, names: Sequence[str] = ()) -> pyarrow.Table:
+    """Return the response's data as a table, like the JSON format but with typed
+    columns: dictionary-encoded categories, date32 dates and int64 downloads.
+    The other fields, like package and type, are kept in the schema metadata.
+    names are the columns when there's no data."""
+    import pyarrow
+
+    data = res["data"]
+    if isinstance(data, dict):
+        data = [data]
+
+    columns: dict[str, pyarrow.Array] = {}
+    for name in data[0] if data else names:
+        values = [row[name] for row in data]
+        if name == "category":
+            # python_major has both numbers and "null"
+            if not all(isinstance(value, str) for value in values):
+                values = [str(value) for value in values]
+            columns[name] = pyarrow.array(values, pyarrow.string()).dictionary_encode()
+        elif name == "date":
+            # Weekly, monthly, quarterly and yearly totals are dated the first day
+            if values and len(values[0]) != len("yyyy-mm-dd"):
+                from . import _pipeline
+
+                values = [_pipeline.period_start(value) for value in values]
+            columns[name] = pyarrow.array(values, pyarrow.string()).cast(
+                pyarrow.date32()
+            )
+        else:
+            columns[name] = pyarrow.array(values, pyarrow.int64())
+
+    metadata = {key: str(value) for key, value in res.items() if key != "data"}
+    return pyarrow.table(columns, metadata=metadata)
+
+
+def to_bytes(table: pyarrow.Table, format_: str) -> bytes:
+    """Serialise the table as an Arrow IPC file or a Parquet file"""
+    import pyarrow
+
+    sink = pyarrow.BufferOutputStream()
+    if format_ == "parquet":
+        import pyarrow.parquet
+
+        pyarrow.parquet.write_table(table, sink)
+    else:
+        with pyarrow.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue().to_pybytes()
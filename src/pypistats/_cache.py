@@ -4,55 +4,956 @@ Cache functions
 
 from __future__ import annotations
 
+import abc
 import datetime as dt
 import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
+from typing import IO, NamedTuple
 
-from platformdirs import user_cache_dir
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    import sqlite3
+    from collections.abc import Callable, Mapping
+    from concurrent.futures import Future
+    from typing import Any, TypeVar
 
-CACHE_DIR = Path(user_cache_dir("pypistats"))
+    from typing_extensions import Self
 
+    T = TypeVar("T")
 
-def filename(url: str) -> Path:
-    """yyyy-mm-dd-url-slug.json"""
-    from slugify import slugify
+# Found on first use, to not import platformdirs unless needed
+CACHE_DIR: Path
 
+MEMORY_MAXSIZE = 256
+MEMORY_MAXBYTES = 64 * 1024 * 1024
+
+# Most bytes of responses to keep on disk, or None for no limit
+MAX_BYTES: int | None = None
+
+# Whether processes sharing the cache take turns to fetch the same URL
+LOCKING = False
+
+# Seconds before a cached response read again is marked as used again, for pruning
+ACCESSED_INTERVAL = 60 * 60
+
+# None, "gzip" or "zstd"
+COMPRESSION: str | None = None
+COMPRESSIONS = {None: ".json", "gzip": ".json.gz", "zstd": ".json.zst"}
+
+
+def __getattr__(name: str) -> Any:
+    if name == "CACHE_DIR":
+        return _cache_dir()
+    msg = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(msg)
+
+
+def _cache_dir() -> Path:
+    """Return CACHE_DIR, setting it to the user cache dir on first use"""
+    global CACHE_DIR
+    try:
+        return CACHE_DIR
+    except NameError:
+        from platformdirs import user_cache_dir
+
+        CACHE_DIR = Path(user_cache_dir("pypistats"))
+        return CACHE_DIR
+
+
+def suffix() -> str:
+    """.json, or with the extension of the compression used for new files"""
+    return COMPRESSIONS[COMPRESSION]
+
+
+def suffixes() -> list[str]:
+    """Every suffix files can have, that of the compression used for new files
+    first, to look for a file whichever compression it was saved with"""
+    return list(dict.fromkeys([suffix(), *COMPRESSIONS.values()]))
+
+
+# Bump when key() changes, so new keys can't clash with old ones
+KEY_VERSION = 2
+
+
+def key(url: str) -> str:
+    """Short, stable cache key for url: its endpoint and a digest of the URL,
+    normalized so the same request always has the same key"""
+    import hashlib
+
+    path, _, query = url.lower().partition("?")
+    params = sorted(param for param in query.split("&") if param)
+    normalized = f"{path.rstrip('/')}?{'&'.join(params)}"
+    digest = hashlib.blake2b(normalized.encode(), digest_size=8).hexdigest()
+
+    endpoint = re.sub(r"[^a-z0-9_]+", "-", path.rstrip("/").rsplit("/", 1)[-1])
+    return f"v{KEY_VERSION}-{endpoint}-{digest}"
+
+
+def _legacy_key(url: str) -> str:
+    """The key used before KEY_VERSION 2, a slug of the URL,
+    to still read files cached by older versions"""
+    return re.sub(r"[^a-z0-9]+", "-", url.lower()).strip("-")
+
+
+def filename(url: str, legacy: bool = False, extension: str | None = None) -> Path:
+    """yyyy-mm-dd-key.json, or .json.gz or .json.zst if compressed.
+    Files named by older versions were never compressed."""
     today = dt.datetime.now(dt.timezone.utc).strftime("%Y-%m-%d")
-    slug = slugify(url)
-    return CACHE_DIR / f"{today}-{slug}.json"
+    if legacy:
+        return _cache_dir() / f"{today}-{_legacy_key(url)}.json"
+    if extension is None:
+        extension = suffix()
+    return _cache_dir() / f"{today}-{key(url)}{extension}"
+
+
+def validators_filename(url: str) -> Path:
+    """validators/key.json, holding the validators of the latest response"""
+    return _cache_dir() / "validators" / f"{key(url)}.json"
+
+
+def _zstd():
+    """Return a module with a zstd open(): the standard library's from Python 3.14,
+    or zstandard"""
+    try:
+        from compression import zstd  # type: ignore[import-not-found]
+    except ImportError:
+        import zstandard as zstd
+
+    return zstd
+
+
+def _open(cache_file: Path, mode: str) -> IO[str]:
+    """Open cache_file as text, compressed or not depending on its extension"""
+    if cache_file.suffix == ".gz":
+        import gzip
+
+        return gzip.open(cache_file, "wt" if mode == "w" else "rt", encoding="utf-8")
+    if cache_file.suffix == ".zst":
+        return _zstd().open(cache_file, mode + "t", encoding="utf-8")
+    return cache_file.open(mode, encoding="utf-8")
 
 
 def load(cache_file: Path):
     """Load data from cache_file"""
+    data, _ = load_sized(cache_file)
+    return data
+
+
+def load_sized(cache_file: Path) -> tuple[Any, int]:
+    """Load data from cache_file, with the size in bytes of its JSON once
+    decompressed, or ({}, 0)"""
     if not cache_file.exists():
-        return {}
+        return {}, 0
 
-    with cache_file.open("r") as f:
-        try:
-            data = json.load(f)
-        except json.decoder.JSONDecodeError:
-            return {}
+    try:
+        with _open(cache_file, "r") as f:
+            text = f.read()
+        data = json.loads(text)
+    except (EOFError, OSError, ValueError):
+        # Invalid JSON, or a truncated or corrupt compressed file
+        return {}, 0
 
-    return data
+    # Saved ASCII-only by json.dump, so one byte per character
+    return data, len(text)
 
 
 def save(cache_file: Path, data) -> None:
-    """Save data to cache_file"""
+    """Save data to cache_file. It's written to a temporary file first, then
+    renamed, so others never see a partly written file."""
+    # Hidden, so not mistaken for a cache file
+    temp_file = cache_file.with_name(
+        f".{os.getpid()}-{threading.get_ident()}-{cache_file.name}"
+    )
     try:
-        if not CACHE_DIR.exists():
-            CACHE_DIR.mkdir(parents=True)
+        if not cache_file.parent.exists():
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
 
-        with cache_file.open("w") as f:
+        with _open(temp_file, "w") as f:
             json.dump(data, f)
+        os.replace(temp_file, cache_file)
 
     except OSError:
-        pass
+        try:
+            temp_file.unlink()
+        except OSError:
+            pass
+
+
+class FileLock:
+    """Exclusive lock on a file, shared between processes and threads.
+    It's released when the lock file is closed, or its process ends.
+    Without a path, it does nothing.
+
+    Args:
+        path: The lock file, created if needed
+    """
+
+    def __init__(self, path: Path | None) -> None:
+        self.path = path
+        self._file: IO[str] | None = None
+
+    def __enter__(self) -> Self:
+        if self.path is None:
+            return self
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self.path.open("a+")
+        except OSError:
+            # Carry on without it, at worst fetching twice
+            return self
+
+        if sys.platform == "win32":
+            import msvcrt
+
+            self._file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # Gave up after 10 seconds, keep waiting
+                    continue
+        else:
+            import fcntl
+
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        if self._file is None:
+            return
+        if sys.platform == "win32":
+            import msvcrt
+
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        # Also releases flock
+        self._file.close()
+        self._file = None
+
+
+def lock(url: str) -> FileLock:
+    """Lock to hold while fetching url, so only one process sharing the cache
+    fetches it at a time. Does nothing unless LOCKING.
+
+    The lock files are never deleted: on POSIX, another process could be waiting
+    on the old one while a third locks a new one."""
+    if not LOCKING:
+        return FileLock(None)
+    return FileLock(_cache_dir() / "locks" / f"{key(url)}.lock")
+
+
+class SingleFlight:
+    """Share one call between threads making it for the same key at the same
+    time: the first calls it, and the others wait for its result or exception"""
+
+    def __init__(self) -> None:
+        self._calls: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, func: Callable[[], T]) -> T:
+        from concurrent.futures import Future
+
+        with self._lock:
+            future = self._calls.get(key)
+            first = future is None
+            if future is None:
+                future = self._calls[key] = Future()
+
+        if not first:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+in_flight = SingleFlight()
+
+
+def lookup(url: str) -> tuple[dict, int] | None:
+    """Return today's data for url and its size in bytes from the backend,
+    or None, counting hits and misses"""
+    cached = backend.get(url)
+    counters.add(hits=cached is not None, misses=cached is None)
+    return cached
+
+
+def store(url: str, data: dict, validators: Mapping | None = None) -> None:
+    """Cache today's data for url in the backend"""
+    backend.set(url, data, validators)
+    counters.add(writes=1)
 
 
 def clear() -> None:
-    """Delete old cache files"""
-    cache_files = CACHE_DIR.glob("**/*.json")
-    this_month = dt.datetime.now(dt.timezone.utc).strftime("%Y-%m")
-    for cache_file in cache_files:
-        if not cache_file.name.startswith(this_month):
-            cache_file.unlink()
+    """Delete old cache entries"""
+    backend.clear()
+
+
+def clear_all() -> None:
+    """Delete all cached responses. History is kept."""
+    backend.clear_all()
+    memory.clear()
+
+
+def maybe_clear() -> None:
+    """Delete old cache entries, but only once a day, so it's cheap to call often.
+    A marker file records when it was last done."""
+    marker = _cache_dir() / ".last-clear"
+    today = _today()
+    try:
+        if marker.read_text() == today:
+            return
+    except OSError:
+        # Never cleared, or can't tell
+        pass
+
+    clear()
+
+    try:
+        marker.parent.mkdir(parents=True, exist_ok=True)
+        marker.write_text(today)
+    except OSError:
+        pass
+
+
+def prune(max_bytes: int | None = None, max_age: int | None = None) -> tuple[int, int]:
+    """Delete cache entries older than max_age days, then the oldest ones until
+    there are no more than max_bytes. Return how many entries and bytes were
+    deleted."""
+    return backend.prune(max_bytes, max_age)
+
+
+def enforce_max_bytes() -> None:
+    """Delete the least recently used entries until there are no more than
+    MAX_BYTES, if anything was added since last time"""
+    if MAX_BYTES is None or not counters.writes:
+        return
+    prune(max_bytes=MAX_BYTES)
+    counters.writes = 0
+
+
+def tidy() -> None:
+    """Run on exit: delete old entries at most once a day, keep to MAX_BYTES,
+    and save the hit and miss counts"""
+    maybe_clear()
+    enforce_max_bytes()
+    counters.save()
+
+
+class Counters:
+    """Hits and misses of the cache backend, saved to a small file so they can
+    be reported across runs"""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+
+    def add(self, hits: int = 0, misses: int = 0, writes: int = 0) -> None:
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.writes += writes
+
+    def load(self) -> dict[str, int]:
+        """Return the saved counts plus this process's"""
+        try:
+            saved = json.loads((_cache_dir() / ".stats").read_text())
+        except (OSError, ValueError):
+            saved = {}
+        with self._lock:
+            return {
+                "hits": saved.get("hits", 0) + self.hits,
+                "misses": saved.get("misses", 0) + self.misses,
+            }
+
+    def save(self) -> None:
+        """Add this process's counts to the saved ones"""
+        if not (self.hits or self.misses):
+            return
+        totals = self.load()
+        try:
+            (_cache_dir() / ".stats").write_text(json.dumps(totals))
+        except OSError:
+            return
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def reset(self) -> None:
+        """Forget all counts, saved or not"""
+        with self._lock:
+            self.hits = self.misses = self.writes = 0
+        try:
+            (_cache_dir() / ".stats").unlink()
+        except OSError:
+            pass
+
+
+counters = Counters()
+
+
+class DiskUsage(NamedTuple):
+    location: str
+    entries: int
+    bytes: int
+
+
+def validators_from_headers(
+    headers: Mapping[str, str], previous: Mapping | None = None
+) -> dict:
+    """Return the validators from response headers: ETag and Last-Modified for
+    conditional requests, and an expiry time from Cache-Control max-age.
+    Any missing from the headers are kept from the previous validators."""
+    previous = previous or {}
+    validators = {
+        "etag": headers.get("ETag", previous.get("etag")),
+        "last_modified": headers.get("Last-Modified", previous.get("last_modified")),
+        "expires": None,
+    }
+    match = re.search(r"max-age=(\d+)", headers.get("Cache-Control", ""))
+    if match:
+        validators["expires"] = time.time() + int(match[1])
+    return validators
+
+
+def conditional_headers(validators: Mapping) -> dict[str, str]:
+    """Return request headers to revalidate a response with its validators"""
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def is_fresh(validators: Mapping) -> bool:
+    """Whether the response can still be used without revalidating it"""
+    expires = validators.get("expires")
+    return expires is not None and time.time() < expires
+
+
+def load_validators(url: str) -> dict:
+    """Load the validators of the latest response for url,
+    with its data and size in bytes from the cache file they belong to"""
+    validators = load(validators_filename(url))
+    if not validators.get("file"):
+        return {}
+
+    data, nbytes = load_sized(Path(validators["file"]))
+    if data == {}:
+        # Can't revalidate without the old response to fall back to
+        return {}
+
+    return {**validators, "data": data, "nbytes": nbytes}
+
+
+def save_validators(url: str, cache_file: Path, validators: Mapping) -> None:
+    """Save validators of the response for url saved in cache_file"""
+    if not any(validators.values()):
+        return
+
+    save(validators_filename(url), {**validators, "file": str(cache_file)})
+
+
+def _today() -> str:
+    return dt.datetime.now(dt.timezone.utc).strftime("%Y-%m-%d")
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+    maxbytes: int
+    currbytes: int
+
+
+class MemoryCache:
+    """In-process LRU cache of parsed API responses, keyed on URL and UTC day,
+    bounded by both number of entries and their size in bytes of JSON"""
+
+    def __init__(
+        self, maxsize: int = MEMORY_MAXSIZE, maxbytes: int = MEMORY_MAXBYTES
+    ) -> None:
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._entries: OrderedDict[tuple[str, str], tuple[dict, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> dict | None:
+        """Return today's data for url, or None if not cached.
+        The data is shared, so copy it before changing it."""
+        with self._lock:
+            entry = self._entries.get((url, _today()))
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((url, _today()))
+            self.hits += 1
+            return entry[0]
+
+    def set(self, url: str, data: dict, nbytes: int) -> None:
+        """Cache today's data for url, evicting the least recently used entries
+        to stay within bounds"""
+        if nbytes > self.maxbytes or self.maxsize <= 0:
+            return
+
+        with self._lock:
+            key = (url, _today())
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (data, nbytes)
+            self._bytes += nbytes
+            self._evict()
+
+    def resize(self, maxsize: int | None = None, maxbytes: int | None = None) -> None:
+        """Change the bounds, evicting entries if now over them"""
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if maxbytes is not None:
+                self.maxbytes = maxbytes
+            self._evict()
+
+    def _evict(self) -> None:
+        while len(self._entries) > max(self.maxsize, 0) or self._bytes > self.maxbytes:
+            _, (_, evicted_bytes) = self._entries.popitem(last=False)
+            self._bytes -= evicted_bytes
+
+    def clear(self) -> None:
+        """Empty the cache and reset its statistics"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(
+                self.hits,
+                self.misses,
+                self.maxsize,
+                len(self._entries),
+                self.maxbytes,
+                self._bytes,
+            )
+
+
+memory = MemoryCache()
+
+
+class Backend(abc.ABC):
+    """Where cached responses are kept, one per URL per UTC day,
+    with the validators of the latest one to revalidate it with"""
+
+    @abc.abstractmethod
+    def location(self, url: str) -> str:
+        """Where the response for url is cached, for verbose output"""
+
+    @abc.abstractmethod
+    def get(self, url: str) -> tuple[dict, int] | None:
+        """Return today's data for url and its size in bytes, or None"""
+
+    @abc.abstractmethod
+    def set(self, url: str, data: dict, validators: Mapping | None = None) -> None:
+        """Cache today's data for url, and any validators to revalidate it with"""
+
+    @abc.abstractmethod
+    def get_previous(self, url: str) -> dict:
+        """Return the validators of the latest response for url that has any,
+        with its "data" and "nbytes", or {} if there's none"""
+
+    @abc.abstractmethod
+    def clear(self) -> None:
+        """Delete entries not from this month"""
+
+    @abc.abstractmethod
+    def clear_all(self) -> None:
+        """Delete all entries"""
+
+    @abc.abstractmethod
+    def prune(
+        self, max_bytes: int | None = None, max_age: int | None = None
+    ) -> tuple[int, int]:
+        """Delete entries not used for max_age days, then the least recently used
+        until there are no more than max_bytes. Return how many entries and bytes
+        were deleted."""
+
+    @abc.abstractmethod
+    def usage(self) -> DiskUsage:
+        """Return where the entries are, how many there are and their size"""
+
+
+class JSONFilesBackend(Backend):
+    """One JSON file per URL per day in CACHE_DIR, the default"""
+
+    def location(self, url: str) -> str:
+        return str(filename(url))
+
+    def get(self, url: str) -> tuple[dict, int] | None:
+        cache_file = self._find(url)
+        if cache_file is None:
+            return None
+
+        data, nbytes = load_sized(cache_file)
+        if data == {}:
+            return None
+
+        try:
+            # Mark as recently used, for pruning
+            os.utime(cache_file)
+        except OSError:
+            # A read-only cache can still be used
+            pass
+        return data, nbytes
+
+    @staticmethod
+    def _find(url: str) -> Path | None:
+        """Today's file for url, whichever compression it was saved with, or
+        maybe cached by an older version, or None"""
+        for extension in suffixes():
+            cache_file = filename(url, extension=extension)
+            if cache_file.is_file():
+                return cache_file
+        cache_file = filename(url, legacy=True)
+        return cache_file if cache_file.is_file() else None
+
+    def set(self, url: str, data: dict, validators: Mapping | None = None) -> None:
+        cache_file = filename(url)
+        save(cache_file, data)
+        if validators:
+            save_validators(url, cache_file, validators)
+
+    def get_previous(self, url: str) -> dict:
+        return load_validators(url)
+
+    def clear(self) -> None:
+        cache_files = _cache_dir().glob("**/*.json*")
+        now = dt.datetime.now(dt.timezone.utc)
+        this_month = now.strftime("%Y-%m")
+        start_of_month = now.replace(day=1, hour=0, minute=0, second=0).timestamp()
+        for cache_file in cache_files:
+            if cache_file.name.startswith("."):
+                # Being written
+                continue
+            elif cache_file.parent.name == "history":
+                # Kept until deleted by hand
+                continue
+            elif cache_file.parent.name == "validators":
+                # Rewritten with each response, so old if not changed this month
+                if cache_file.stat().st_mtime < start_of_month:
+                    cache_file.unlink()
+            elif not cache_file.name.startswith(this_month):
+                cache_file.unlink()
+
+    def clear_all(self) -> None:
+        for cache_file in [
+            *_cache_dir().glob("*.json*"),
+            *(_cache_dir() / "validators").glob("*.json"),
+        ]:
+            try:
+                cache_file.unlink()
+            except OSError:
+                pass
+
+    def prune(
+        self, max_bytes: int | None = None, max_age: int | None = None
+    ) -> tuple[int, int]:
+        # Least recently used first
+        entries = sorted(self._entries())
+
+        to_delete = []
+        if max_age is not None:
+            cutoff = time.time() - max_age * 24 * 60 * 60
+            while entries and entries[0][0] < cutoff:
+                to_delete.append(entries.pop(0))
+        if max_bytes is not None:
+            total = sum(size for _, size, _ in entries)
+            while entries and total > max_bytes:
+                entry = entries.pop(0)
+                total -= entry[1]
+                to_delete.append(entry)
+
+        deleted_count = deleted_bytes = 0
+        for _, size, cache_file in to_delete:
+            try:
+                cache_file.unlink()
+            except OSError:
+                continue
+            deleted_count += 1
+            deleted_bytes += size
+        return deleted_count, deleted_bytes
+
+    def usage(self) -> DiskUsage:
+        entries = self._entries()
+        return DiskUsage(
+            str(_cache_dir()), len(entries), sum(size for _, size, _ in entries)
+        )
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        """Return the last used time, size and path of each cache file"""
+        entries = []
+        for cache_file in _cache_dir().glob("*.json*"):
+            if cache_file.name.startswith("."):
+                # Being written
+                continue
+            try:
+                stat = cache_file.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, cache_file))
+        return entries
+
+
+class SQLiteBackend(Backend):
+    """All responses in a single SQLite database, indexed by URL and date.
+    Uses write-ahead logging so many processes can share it.
+
+    Args:
+        path: The database file, by default cache.sqlite3 in CACHE_DIR
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use"""
+        import sqlite3
+
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            path = self.path or _cache_dir() / "cache.sqlite3"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                connection.execute("""CREATE TABLE IF NOT EXISTS responses (
+                        url TEXT NOT NULL,
+                        date TEXT NOT NULL,
+                        data TEXT NOT NULL,
+                        etag TEXT,
+                        last_modified TEXT,
+                        expires REAL,
+                        accessed REAL,
+                        PRIMARY KEY (url, date)
+                    )""")
+                connection.execute(
+                    "CREATE INDEX IF NOT EXISTS responses_date ON responses (date)"
+                )
+                connection.execute(
+                    "CREATE INDEX IF NOT EXISTS responses_accessed "
+                    "ON responses (accessed)"
+                )
+            self._local.connection = connection
+        return connection
+
+    def close(self) -> None:
+        """Close this thread's connection"""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def location(self, url: str) -> str:
+        return f"{self.path or _cache_dir() / 'cache.sqlite3'} ({url}, {_today()})"
+
+    def get(self, url: str) -> tuple[dict, int] | None:
+        import sqlite3
+
+        today = _today()
+        try:
+            connection = self._connection()
+            with connection:
+                row = connection.execute(
+                    "SELECT data, accessed FROM responses WHERE url = ? AND date = ?",
+                    (url, today),
+                ).fetchone()
+                now = time.time()
+                if row is not None and (
+                    row[1] is None or now - row[1] >= ACCESSED_INTERVAL
+                ):
+                    # Mark as recently used, for pruning, but not on every hit
+                    # to not write to the database for each read
+                    connection.execute(
+                        "UPDATE responses SET accessed = ? WHERE url = ? AND date = ?",
+                        (now, url, today),
+                    )
+        except sqlite3.Error:
+            return None
+
+        if row is None:
+            return None
+        try:
+            return json.loads(row[0]), len(row[0])
+        except ValueError:
+            return None
+
+    def set(self, url: str, data: dict, validators: Mapping | None = None) -> None:
+        import sqlite3
+
+        validators = validators or {}
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        url,
+                        _today(),
+                        json.dumps(data),
+                        validators.get("etag"),
+                        validators.get("last_modified"),
+                        validators.get("expires"),
+                        time.time(),
+                    ),
+                )
+        except sqlite3.Error:
+            pass
+
+    def get_previous(self, url: str) -> dict:
+        import sqlite3
+
+        try:
+            row = (
+                self._connection()
+                .execute(
+                    """SELECT data, etag, last_modified, expires FROM responses
+                    WHERE url = ? AND (
+                        etag IS NOT NULL
+                        OR last_modified IS NOT NULL
+                        OR expires IS NOT NULL
+                    )
+                    ORDER BY date DESC LIMIT 1""",
+                    (url,),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error:
+            return {}
+
+        if row is None:
+            return {}
+        data, etag, last_modified, expires = row
+        try:
+            return {
+                "etag": etag,
+                "last_modified": last_modified,
+                "expires": expires,
+                "data": json.loads(data),
+                "nbytes": len(data),
+            }
+        except ValueError:
+            return {}
+
+    def clear(self) -> None:
+        import sqlite3
+
+        start_of_month = _today()[:7] + "-01"
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute(
+                    "DELETE FROM responses WHERE date < ?", (start_of_month,)
+                )
+        except sqlite3.Error:
+            pass
+
+    def clear_all(self) -> None:
+        import sqlite3
+
+        try:
+            connection = self._connection()
+            with connection:
+                connection.execute("DELETE FROM responses")
+            connection.execute("VACUUM")
+        except sqlite3.Error:
+            pass
+
+    def prune(
+        self, max_bytes: int | None = None, max_age: int | None = None
+    ) -> tuple[int, int]:
+        import sqlite3
+
+        deleted_count = deleted_bytes = 0
+        try:
+            connection = self._connection()
+            with connection:
+                if max_age is not None:
+                    cutoff = time.time() - max_age * 24 * 60 * 60
+                    count, nbytes = connection.execute(
+                        "SELECT COUNT(*), TOTAL(LENGTH(data)) FROM responses "
+                        "WHERE accessed < ?",
+                        (cutoff,),
+                    ).fetchone()
+                    connection.execute(
+                        "DELETE FROM responses WHERE accessed < ?", (cutoff,)
+                    )
+                    deleted_count += count
+                    deleted_bytes += int(nbytes)
+
+                if max_bytes is not None:
+                    # Keep the most recently used entries that fit in max_bytes
+                    rows = connection.execute(
+                        "SELECT url, date, LENGTH(data) FROM responses "
+                        "ORDER BY accessed DESC"
+                    ).fetchall()
+                    total = 0
+                    for url, date, nbytes in rows:
+                        total += nbytes
+                        if total > max_bytes:
+                            connection.execute(
+                                "DELETE FROM responses WHERE url = ? AND date = ?",
+                                (url, date),
+                            )
+                            deleted_count += 1
+                            deleted_bytes += nbytes
+            if deleted_count:
+                # Give the space back to the filesystem
+                connection.execute("VACUUM")
+        except sqlite3.Error:
+            pass
+
+        return deleted_count, deleted_bytes
+
+    def usage(self) -> DiskUsage:
+        import sqlite3
+
+        path = str(self.path or _cache_dir() / "cache.sqlite3")
+        try:
+            entries, nbytes = (
+                self._connection()
+                .execute("SELECT COUNT(*), TOTAL(LENGTH(data)) FROM responses")
+                .fetchone()
+            )
+        except sqlite3.Error:
+            return DiskUsage(path, 0, 0)
+        return DiskUsage(path, entries, int(nbytes))
+
+
+BACKENDS: dict[str, type[Backend]] = {
+    "json": JSONFilesBackend,
+    "sqlite": SQLiteBackend,
+}
+
+backend: Backend = JSONFilesBackend()
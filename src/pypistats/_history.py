@@ -0,0 +1,72 @@
+"""
+History functions, keeping time series rows from earlier fetches so they're
+still available once the API no longer serves them
+"""
+
+from __future__ import annotations
+
+from . import _cache
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def filename(url: str, suffix: str | None = None) -> Path:
+    """history/key.json, or .json.gz or .json.zst if compressed"""
+    if suffix is None:
+        suffix = _cache.suffix()
+    return _cache.CACHE_DIR / "history" / f"{_cache.key(url)}{suffix}"
+
+
+def _find(url: str) -> Path | None:
+    """The history file for url, whichever compression it was saved with, or None.
+    The compression used for new files is tried first, then the others."""
+    for suffix in _cache.suffixes():
+        history_file = filename(url, suffix)
+        if history_file.exists():
+            return history_file
+    return None
+
+
+def merge(url: str, res: dict) -> dict:
+    """Merge the rows of a response into the history for url, and return the
+    response with all the rows from the history.
+
+    A row seen again replaces the earlier one, in case it has been updated.
+    The history file is only rewritten when there are new or updated rows,
+    with the compression used for new files.
+    """
+    data = res.get("data")
+    if not isinstance(data, list) or not data:
+        # /recent has no time series
+        return res
+
+    history_file = filename(url)
+    previous_file = _find(url)
+    history = _cache.load(previous_file) if previous_file else {}
+
+    rows = {(row["category"], row["date"]): row for row in history.get("data", [])}
+    changed = False
+    for row in data:
+        key = (row["category"], row["date"])
+        if rows.get(key) != row:
+            rows[key] = row
+            changed = True
+
+    # Same order as the API: by category, then date. Categories can be numbers
+    # and "null", as for python_major, so compare them as strings.
+    res = {
+        **res,
+        "data": [rows[key] for key in sorted(rows, key=lambda k: (str(k[0]), k[1]))],
+    }
+    if changed:
+        _cache.save(history_file, res)
+        if previous_file and previous_file != history_file and history_file.exists():
+            # Saved with another compression
+            try:
+                previous_file.unlink()
+            except OSError:
+                pass
+
+    return res
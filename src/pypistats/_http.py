@@ -0,0 +1,259 @@
+"""
+HTTP client functions
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any
+
+    import urllib3
+    from typing_extensions import Self
+
+DEFAULT_MAXSIZE = 10
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_RETRIES = 3
+
+# Retried with backoff: too many requests, and server errors likely to pass
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+BACKOFF_FACTOR = 0.5
+BACKOFF_MAX = 60.0
+# Most seconds to wait as Retry-After asks, so a bad header can't stall callers
+RETRY_AFTER_MAX = 300.0
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` requests a second on average, in bursts of up
+    to `burst`. Share one between clients, threads and async tasks to pace them
+    all together.
+
+    reserve() takes a token and returns how long to wait before using it,
+    so callers can sleep however suits them: wait() sleeps, async_wait() awaits.
+
+    Args:
+        rate: Requests per second
+        burst: Requests that can be made at once after a pause
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        if rate <= 0:
+            msg = "rate must be positive"
+            raise ValueError(msg)
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return the seconds to wait before making a request"""
+        with self._lock:
+            now = time.monotonic()
+            if now > self._updated:
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+            self._tokens -= 1
+            # Later than now during a pause
+            delay = self._updated - now
+            if self._tokens < 0:
+                delay += -self._tokens / self.rate
+            return delay
+
+    def pause(self, seconds: float) -> None:
+        """Make everyone wait at least this long, such as when the server says
+        it's had too many requests. Afterwards, one request can be made at once,
+        then the rest are paced at `rate`, without a burst."""
+        with self._lock:
+            paused_until = time.monotonic() + seconds
+            if paused_until > self._paused_until:
+                self._paused_until = paused_until
+                # Tokens start filling again once the pause is over
+                self._updated = paused_until
+                self._tokens = 1.0
+
+    def wait(self) -> None:
+        """Wait until a request can be made"""
+        time.sleep(self.reserve())
+
+    async def async_wait(self) -> None:
+        """Wait until a request can be made, without blocking the event loop"""
+        import asyncio
+
+        await asyncio.sleep(self.reserve())
+
+
+def retry_delay(attempt: int, retry_after: str | None = None) -> float:
+    """Return the seconds to wait before retrying a request for the attempt-th
+    time, counting from 0: what the Retry-After header asks for, if any, up to
+    RETRY_AFTER_MAX, otherwise exponential backoff with jitter"""
+    if retry_after:
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            from email.utils import parsedate_to_datetime
+
+            try:
+                delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+            except (TypeError, ValueError):
+                # Invalid, so fall back to backoff
+                delay = None
+        if delay is not None:
+            return min(RETRY_AFTER_MAX, max(0.0, delay))
+
+    import random
+
+    backoff = min(BACKOFF_MAX, BACKOFF_FACTOR * 2**attempt)
+    # Jitter so many clients backing off don't all retry at once
+    return backoff / 2 + random.uniform(0, backoff / 2)
+
+
+class Client:
+    """Reusable HTTP client, sharing one pool of keep-alive connections
+    between all API calls made with it.
+
+    Args:
+        maxsize: Number of connections to keep open per host
+        timeout: Connect and read timeout in seconds,
+                 or a urllib3.Timeout for finer control
+        retries: How many times to retry failed connections and reads, and
+                 responses with a status in RETRY_STATUSES, after waiting as
+                 Retry-After asks or backing off exponentially. Or a urllib3.Retry
+                 for finer control, with which statuses aren't retried here.
+        block: Whether to wait for a free connection when maxsize are in use,
+               instead of opening a new, unpooled one
+        rate: Most requests a second, or None for no limit
+        limiter: A RateLimiter to share with other clients, instead of rate
+    """
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_MAXSIZE,
+        timeout: float | urllib3.Timeout = DEFAULT_TIMEOUT,
+        retries: int | urllib3.Retry = DEFAULT_RETRIES,
+        block: bool = False,
+        rate: float | None = None,
+        limiter: RateLimiter | None = None,
+    ) -> None:
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.retries = retries
+        self.block = block
+        if limiter is None and rate is not None:
+            limiter = RateLimiter(rate)
+        self.limiter = limiter
+        self._pool: urllib3.PoolManager | None = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    @property
+    def pool(self) -> urllib3.PoolManager:
+        """The connection pool, created on first use"""
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = self._new_pool()
+        return self._pool
+
+    def _new_pool(self) -> urllib3.PoolManager:
+        import urllib3
+
+        retries = self.retries
+        if isinstance(retries, int):
+            # Only retry connection problems here, HTTP error statuses are handled
+            # by get(), which keeps to the limiter and caps Retry-After
+            retries = urllib3.Retry(
+                total=retries,
+                status=0,
+                backoff_factor=0.5,
+                raise_on_status=False,
+                respect_retry_after_header=False,
+            )
+
+        return urllib3.PoolManager(
+            maxsize=self.maxsize,
+            block=self.block,
+            timeout=self.timeout,
+            retries=retries,
+        )
+
+    def get(
+        self,
+        url: str,
+        headers: dict[str, str] | None = None,
+        preload_content: bool = True,
+    ) -> urllib3.BaseHTTPResponse:
+        """GET the url using a pooled connection, keeping to the rate limit
+        and retrying rate limited and server error responses.
+
+        Without preload_content, the body is left to be streamed, and the caller
+        must release the connection."""
+        from . import USER_AGENT, _print_verbose
+
+        headers = {"User-Agent": USER_AGENT, **(headers or {})}
+        status_retries = self.retries if isinstance(self.retries, int) else 0
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                self.limiter.wait()
+            if preload_content:
+                r = self.pool.request("GET", url, headers=headers)
+            else:
+                r = self.pool.request(
+                    "GET", url, headers=headers, preload_content=False
+                )
+            if r.status not in RETRY_STATUSES or attempt >= status_retries:
+                return r
+            if not preload_content:
+                r.drain_conn()
+                r.release_conn()
+
+            delay = retry_delay(attempt, r.headers.get("Retry-After"))
+            _print_verbose(f"HTTP status code: {r.status}, retrying in {delay:.1f}s")
+            if self.limiter is not None and r.status == 429:
+                # Slow down other requests sharing the limiter too
+                self.limiter.pause(delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self) -> None:
+        """Close all pooled connections. The client can still be used after,
+        and will open new connections as needed."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.clear()
+
+
+_default_client: Client | None = None
+_default_client_lock = threading.Lock()
+
+
+def default_client() -> Client:
+    """Return the client shared by all calls not given their own"""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = Client()
+    return _default_client
+
+
+def configure_default_client(**kwargs: Any) -> None:
+    """Replace the client shared by all calls not given their own
+    with Client(**kwargs)"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is not None:
+            _default_client.close()
+        _default_client = Client(**kwargs)
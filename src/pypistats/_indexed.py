@@ -0,0 +1,73 @@
+"""
+Time series rows indexed by category and date, to filter them by binary search.
+Gives the same results as the pure Python functions.
+"""
+
+from __future__ import annotations
+
+import bisect
+import itertools
+import operator
+
+
+class Rows:
+    """Time series rows grouped by category, each group sorted by date, as the API
+    and history return them.
+
+    offsets has the start and stop index of each category's rows, so rows between
+    two dates are found by bisecting each group, and the first and last dates are
+    known without looking at every row."""
+
+    def __init__(
+        self, rows: list[dict], dates: list[str], offsets: dict[object, tuple[int, int]]
+    ) -> None:
+        self._rows = rows
+        self._dates = dates
+        self.offsets = offsets
+        self.first: str | None = None
+        self.last: str | None = None
+        if rows:
+            self.first = min(dates[start] for start, _ in offsets.values())
+            self.last = max(dates[stop - 1] for _, stop in offsets.values())
+
+    @classmethod
+    def from_rows(cls, rows: list[dict]) -> Rows | None:
+        """Index the rows, or return None if they aren't grouped by category and
+        sorted by date, or aren't a time series"""
+        dates: list[str] = []
+        offsets = {}
+        try:
+            for category, group in itertools.groupby(
+                rows, operator.itemgetter("category")
+            ):
+                group_dates = [row["date"] for row in group]
+                if category in offsets or group_dates != sorted(group_dates):
+                    # Not grouped or not sorted
+                    return None
+                offsets[category] = (len(dates), len(dates) + len(group_dates))
+                dates += group_dates
+        except (KeyError, TypeError):
+            # Not a time series, or dates that aren't all strings
+            return None
+        return cls(rows, dates, offsets)
+
+    def rows(self) -> list[dict]:
+        return self._rows
+
+    def filter(
+        self, start_date: str | None = None, end_date: str | None = None
+    ) -> Rows:
+        """Only keep rows with dates between start_date and end_date"""
+        rows: list[dict] = []
+        dates: list[str] = []
+        offsets = {}
+        for category, (start, stop) in self.offsets.items():
+            if start_date:
+                start = bisect.bisect_left(self._dates, start_date, start, stop)
+            if end_date:
+                stop = bisect.bisect_right(self._dates, end_date, start, stop)
+            if start < stop:
+                offsets[category] = (len(rows), len(rows) + stop - start)
+                rows += self._rows[start:stop]
+                dates += self._dates[start:stop]
+        return Rows(rows, dates, offsets)
@@ -0,0 +1,248 @@
+"""
+Filtering and totalling rows of time series as a pipeline of stages.
+
+A stage is a callable taking an iterable of rows and returning an iterable of rows.
+Stages that can work a row at a time are generators, so rows pass through them
+without lists being made in between. Totals does the filtering and totalling of
+the others, and finds the grand total and date range, in a single pass.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+
+    Stage = Callable[[Iterable[dict]], Iterable[dict]]
+
+
+def run(rows: Iterable[dict], stages: Iterable[Stage]) -> Iterable[dict]:
+    """Pass the rows through each stage in turn"""
+    for stage in stages:
+        rows = stage(rows)
+    return rows
+
+
+def filter_dates(start_date: str | None = None, end_date: str | None = None) -> Stage:
+    """A stage only keeping rows with dates between start_date and end_date"""
+
+    def stage(rows: Iterable[dict]) -> Iterator[dict]:
+        for row in rows:
+            if "date" not in row:
+                continue
+            if start_date and row["date"] < start_date:
+                continue
+            if end_date and row["date"] > end_date:
+                continue
+            yield row
+
+    if not start_date and not end_date:
+        return iter
+    return stage
+
+
+def total_all(rows: Iterable[dict]) -> Iterator[dict]:
+    """Sum all downloads per category, regardless of date"""
+    totalled: dict = {}
+    for row in rows:
+        category = row["category"]
+        totalled[category] = totalled.get(category, 0) + row["downloads"]
+
+    for category, downloads in totalled.items():
+        yield {"category": category, "downloads": downloads}
+
+
+def week(date: str) -> str:
+    """The ISO week of a date, like 2018-W36"""
+    iso_year, iso_week, _ = dt.date.fromisoformat(date).isocalendar()
+    return f"{iso_year}-W{iso_week:02}"
+
+
+def month(date: str) -> str:
+    """The month of a date, like 2018-09"""
+    return date[:7]
+
+
+def quarter(date: str) -> str:
+    """The quarter of a date, like 2018-Q3"""
+    return f"{date[:4]}-Q{(int(date[5:7]) + 2) // 3}"
+
+
+def year(date: str) -> str:
+    """The year of a date, like 2018"""
+    return date[:4]
+
+
+# The period of a date for each total, other than daily and all. Each sorts in the
+# same order as the dates in it.
+PERIODS = {"weekly": week, "monthly": month, "quarterly": quarter, "yearly": year}
+
+
+def period_start(period: str) -> str:
+    """The first date of a period, like 2018-09-03 for 2018-W36"""
+    yyyy, _, part = period.partition("-")
+    if not part:
+        return f"{yyyy}-01-01"
+    if part.startswith("W"):
+        return dt.date.fromisocalendar(int(yyyy), int(part[1:]), 1).isoformat()
+    if part.startswith("Q"):
+        return f"{yyyy}-{int(part[1:]) * 3 - 2:02}-01"
+    if len(part) == len("mm"):
+        return f"{period}-01"
+    return period
+
+
+def columns(total: str) -> tuple[str, ...]:
+    """The columns of the rows for a total, to give their schema when there are none"""
+    if total == "all":
+        return ("category", "downloads")
+    return ("category", "date", "downloads")
+
+
+def total_periods(total: str) -> Stage:
+    """A stage summing downloads per category, by period for a total in PERIODS,
+    or regardless of date for all"""
+    if total == "all":
+        return total_all
+    period_of = PERIODS[total]
+
+    def stage(rows: Iterable[dict]) -> Iterator[dict]:
+        # Periods of dates seen so far, as there are many rows for each date
+        periods: dict[str, str] = {}
+        totalled: dict = {}
+        for row in rows:
+            date = row["date"]
+            period = periods.get(date)
+            if period is None:
+                period = periods[date] = period_of(date)
+            category_totals = totalled.setdefault(row["category"], {})
+            category_totals[period] = category_totals.get(period, 0) + row["downloads"]
+
+        for category, category_totals in totalled.items():
+            for period, downloads in category_totals.items():
+                yield {"category": category, "date": period, "downloads": downloads}
+
+    return stage
+
+
+def total_monthly(rows: Iterable[dict]) -> Iterator[dict]:
+    """Sum all downloads per category, by month"""
+    yield from total_periods("monthly")(rows)
+
+
+class DateRange:
+    """A stage passing rows through unchanged, noting the first and last dates
+    once they've all passed, or None if any has no date"""
+
+    def __init__(self) -> None:
+        self.first: str | None = None
+        self.last: str | None = None
+
+    def __call__(self, rows: Iterable[dict]) -> Iterator[dict]:
+        first = last = None
+        dated = True
+        for row in rows:
+            if "date" not in row:
+                dated = False
+            elif first is None or last is None:
+                first = last = row["date"]
+            elif row["date"] < first:
+                first = row["date"]
+            elif row["date"] > last:
+                last = row["date"]
+            yield row
+
+        if dated:
+            self.first, self.last = first, last
+
+
+def grand_total(totals: dict) -> int:
+    """Return the grand total of downloads per category, in order of first
+    appearance"""
+    # For "overall", without_mirrors is a subset of with_mirrors.
+    # Only count the larger.
+    if next(iter(totals), None) in ("with_mirrors", "without_mirrors"):
+        return max(totals.get("with_mirrors", 0), totals.get("without_mirrors", 0))
+    return sum(totals.values())
+
+
+class Totals:
+    """A stage filtering and totalling rows in one pass, like filter_dates then
+    total_periods.
+
+    Once the rows have all passed, first and last are the dates of all the rows,
+    including those filtered out, or None if any has no date. grand_total is the
+    total of the rows kept, as for the table's total row."""
+
+    def __init__(
+        self,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        total: str = "all",
+    ) -> None:
+        self.start_date = start_date
+        self.end_date = end_date
+        self.total = total
+        self.first: str | None = None
+        self.last: str | None = None
+        self.grand_total = 0
+
+    def __call__(self, rows: Iterable[dict]) -> Iterator[dict]:
+        start_date, end_date = self.start_date, self.end_date
+        filtered = bool(start_date or end_date)
+        period_of = PERIODS.get(self.total)
+        periods: dict[str, str] = {}
+        # Downloads by category, or by category then period
+        totalled: dict = {}
+        first = last = None
+        dated = True
+        for row in rows:
+            date = row.get("date")
+            if date is None:
+                dated = False
+                if filtered:
+                    continue
+            else:
+                if first is None or last is None:
+                    first = last = date
+                elif date < first:
+                    first = date
+                elif date > last:
+                    last = date
+                if filtered and (
+                    (start_date and date < start_date) or (end_date and date > end_date)
+                ):
+                    continue
+
+            if period_of is None:
+                category = row["category"]
+                totalled[category] = totalled.get(category, 0) + row["downloads"]
+            else:
+                date = row["date"]
+                period = periods.get(date)
+                if period is None:
+                    period = periods[date] = period_of(date)
+                category_totals = totalled.setdefault(row["category"], {})
+                category_totals[period] = (
+                    category_totals.get(period, 0) + row["downloads"]
+                )
+
+        if dated:
+            self.first, self.last = first, last
+
+        if period_of is None:
+            self.grand_total = grand_total(totalled)
+            for category, downloads in totalled.items():
+                yield {"category": category, "downloads": downloads}
+        else:
+            self.grand_total = grand_total(
+                {
+                    category: sum(category_totals.values())
+                    for category, category_totals in totalled.items()
+                }
+            )
+            for category, category_totals in totalled.items():
+                for period, downloads in category_totals.items():
+                    yield {"category": category, "date": period, "downloads": downloads}
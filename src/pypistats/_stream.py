@@ -0,0 +1,145 @@
+"""
+Parse API responses as they're read, so their rows can be filtered and totalled on
+the way and the whole response is never in memory at once
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+import re
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from typing import Any
+
+# Bytes to read from the response at a time
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class Response:
+    """A JSON response object read from chunks of bytes.
+
+    Iterating yields the rows of its "data" list one at a time, decoding each once
+    it has been read. After that, fields has the other fields, like package and
+    type, with "data" set to None. If "data" isn't a list, like for recent,
+    nothing is yielded and it's in fields too.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self.fields: dict[str, Any] = {}
+        self.nrows = 0
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._done = False
+
+    def __iter__(self) -> Iterator[dict]:
+        self._expect("{")
+        if self._skip() == "}":
+            self._pos += 1
+            return
+
+        while True:
+            key = self._value()
+            self._expect(":")
+            if key == "data" and self._skip() == "[":
+                self._pos += 1
+                self.fields[key] = None
+                yield from self._rows()
+            else:
+                self.fields[key] = self._value()
+            if self._expect(",}") == "}":
+                return
+
+    def _rows(self) -> Iterator[dict]:
+        """Yield the values of a list, after its opening bracket"""
+        if self._skip() == "]":
+            self._pos += 1
+            return
+
+        while True:
+            rows = self._batch()
+            if rows:
+                self.nrows += len(rows)
+                yield from rows
+                continue
+
+            yield self._value()
+            self.nrows += 1
+            if self._expect(",]") == "]":
+                return
+
+    def _batch(self) -> list:
+        """Decode the rows up to the last "}," read so far in one go, which is much
+        faster than one at a time. If that isn't where a row ends, it isn't valid
+        JSON on its own, so return nothing to decode one at a time instead."""
+        end = self._buffer.rfind("},", self._pos)
+        if end == -1:
+            return []
+        try:
+            rows = json.loads(f"[{self._buffer[self._pos : end + 1]}]")
+        except json.JSONDecodeError:
+            return []
+        # Past the comma, at the next row
+        self._pos = end + 2
+        return rows
+
+    def _read(self) -> bool:
+        """Add the next chunk to the buffer, dropping what's already been parsed.
+        Return False if there are no more."""
+        if self._done:
+            return False
+
+        self._buffer = self._buffer[self._pos :]
+        self._pos = 0
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._buffer += self._decoder.decode(b"", final=True)
+            self._done = True
+            return False
+        self._buffer += self._decoder.decode(chunk)
+        return True
+
+    def _skip(self) -> str:
+        """Skip whitespace and return the next character"""
+        while True:
+            match = _WHITESPACE.match(self._buffer, self._pos)
+            assert match is not None  # It matches nothing too
+            self._pos = match.end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read():
+                msg = "Unexpected end of response"
+                raise json.JSONDecodeError(msg, self._buffer, self._pos)
+
+    def _expect(self, chars: str) -> str:
+        """Skip whitespace, then one of chars, and return it"""
+        char = self._skip()
+        if char not in chars:
+            msg = f"Expecting one of {chars!r}"
+            raise json.JSONDecodeError(msg, self._buffer, self._pos)
+        self._pos += 1
+        return char
+
+    def _value(self) -> Any:
+        """Decode the next value, reading more chunks until it's complete"""
+        self._skip()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._read():
+                    raise
+                continue
+            # A number at the end may carry on in the next chunk
+            if end == len(self._buffer) and self._read():
+                continue
+            self._pos = end
+            return value
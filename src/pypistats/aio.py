@@ -0,0 +1,238 @@
+"""
+Asynchronous interface to PyPI Stats API, using aiohttp
+https://pypistats.org/api
+"""
+
+from __future__ import annotations
+
+import asyncio
+import weakref
+
+import pypistats
+from pypistats import _http
+
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator, Sequence
+    from typing import Any
+
+    import aiohttp
+    from typing_extensions import Self
+
+    from ._pipeline import Stage
+
+DEFAULT_LIMIT = 10
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_RETRIES = _http.DEFAULT_RETRIES
+
+
+class Client:
+    """Asynchronous HTTP client, sharing one aiohttp session and its connections
+    between all API calls made with it.
+
+    Args:
+        limit: Maximum number of requests in flight, and of open connections
+        timeout: Total timeout for each request in seconds
+        retries: How many times to retry responses with a status in
+                 pypistats._http.RETRY_STATUSES, after waiting as Retry-After asks
+                 or backing off exponentially
+        rate: Most requests a second, or None for no limit
+        limiter: A pypistats.RateLimiter to share with other clients, instead of rate
+    """
+
+    def __init__(
+        self,
+        limit: int = DEFAULT_LIMIT,
+        timeout: float = DEFAULT_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        rate: float | None = None,
+        limiter: _http.RateLimiter | None = None,
+    ):
+        self.limit = limit
+        self.timeout = timeout
+        self.retries = retries
+        if limiter is None and rate is not None:
+            limiter = _http.RateLimiter(rate)
+        self.limiter = limiter
+        self._semaphore = asyncio.Semaphore(limit)
+        self._session: aiohttp.ClientSession | None = None
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        await self.close()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """The aiohttp session, created on first use"""
+        if self._session is None or self._session.closed:
+            import aiohttp
+
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.limit),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"User-Agent": pypistats.USER_AGENT},
+            )
+        return self._session
+
+    async def get(self, url: str) -> tuple[int, bytes]:
+        """GET the url, waiting if limit requests are already in flight or to keep
+        to the rate limit, and return the status and body. Rate limited and server
+        error responses are retried."""
+        attempt = 0
+        while True:
+            if self.limiter is not None:
+                await self.limiter.async_wait()
+            async with self._semaphore:
+                async with self.session.get(url) as r:
+                    status, body = r.status, await r.read()
+                    if status not in _http.RETRY_STATUSES or attempt >= self.retries:
+                        return status, body
+                    retry_after = r.headers.get("Retry-After")
+
+            delay = _http.retry_delay(attempt, retry_after)
+            pypistats._print_verbose(
+                f"HTTP status code: {status}, retrying in {delay:.1f}s"
+            )
+            if self.limiter is not None and status == 429:
+                # Slow down other requests sharing the limiter too
+                self.limiter.pause(delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def close(self) -> None:
+        """Close the session and its connections"""
+        if self._session is not None:
+            await self._session.close()
+
+
+# Clients shared by calls not given their own, one per event loop as an aiohttp
+# session can only be used on the loop it was made on, with what closes each
+_default_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, tuple[Client, AsyncIterator[None]]
+] = weakref.WeakKeyDictionary()
+
+
+async def _close_at_shutdown(client: Client) -> AsyncIterator[None]:
+    """Close the client when the event loop shuts down its async generators,
+    as asyncio.run() does before closing the loop"""
+    loop = asyncio.get_running_loop()
+    try:
+        yield
+    finally:
+        _default_clients.pop(loop, None)
+        await client.close()
+
+
+async def default_client() -> Client:
+    """Return the client shared by all calls on the running event loop not given
+    their own, created on first use and closed when the loop shuts down its async
+    generators. Until then it's kept, and so is the loop, which both the closing
+    generator and the client's session refer to."""
+    loop = asyncio.get_running_loop()
+    if loop not in _default_clients:
+        client = Client()
+        closer = _close_at_shutdown(client)
+        _default_clients[loop] = (client, closer)
+        await closer.__anext__()
+    return _default_clients[loop][0]
+
+
+async def pypi_stats_api(
+    endpoint: str,
+    params: str | None = None,
+    format: str | None = "pretty",
+    start_date: str | None = None,
+    end_date: str | None = None,
+    sort: bool | str = True,
+    total: str = "all",
+    color: str = "yes",
+    client: Client | None = None,
+    history: bool = False,
+    stages: Sequence[Stage] = (),
+):
+    """Call the API and return JSON.
+
+    Pass a Client to use its session and concurrency limit, otherwise calls on the
+    same event loop share a default one.
+
+    With history, rows from earlier calls are kept and included, so dates can be
+    older than the 180 days the API has.
+
+    Stages are extra steps for the rows of time series, as for
+    pypistats.pypi_stats_api.
+    """
+    pypistats._validate_total(total)
+    url = pypistats._url(endpoint, params)
+
+    # Disk access in a thread, to not block the event loop
+    res = await asyncio.to_thread(pypistats._load_cache, endpoint, url)
+
+    if res is None:
+        # No cache, or couldn't load cache
+        import json
+
+        if client is None:
+            client = await default_client()
+        status, body = await client.get(url)
+        pypistats._raise_for_status(status, url)
+
+        res = json.loads(body.decode("utf-8"))
+        await asyncio.to_thread(pypistats._save_cache, url, res, len(body))
+
+    if history:
+        from . import _history
+
+        res = await asyncio.to_thread(_history.merge, url, res)
+
+    return pypistats._process(
+        pypistats._copy(res),
+        format,
+        start_date,
+        end_date,
+        sort,
+        total,
+        color,
+        stacklevel=4,
+        stages=stages,
+    )
+
+
+async def recent(package: str, period: str | None = None, **kwargs: Any):
+    """Retrieve the aggregate download quantities for the last 1/7/30 days,
+    excluding downloads from mirrors"""
+    endpoint = f"packages/{package}/recent"
+    params = pypistats._paramify("period", period)
+    return await pypi_stats_api(endpoint, params, **kwargs)
+
+
+async def overall(package: str, mirrors: bool | str | None = None, **kwargs: Any):
+    """Retrieve the aggregate daily download time series with or without mirror
+    downloads"""
+    endpoint = f"packages/{package}/overall"
+    params = pypistats._paramify("mirrors", mirrors)
+    return await pypi_stats_api(endpoint, params, **kwargs)
+
+
+async def python_major(package: str, version: str | None = None, **kwargs: Any):
+    """Retrieve the aggregate daily download time series by Python major version
+    number"""
+    endpoint = f"packages/{package}/python_major"
+    params = pypistats._paramify("version", version)
+    return await pypi_stats_api(endpoint, params, **kwargs)
+
+
+async def python_minor(package: str, version: str | None = None, **kwargs: Any):
+    """Retrieve the aggregate daily download time series by Python minor version
+    number"""
+    endpoint = f"packages/{package}/python_minor"
+    params = pypistats._paramify("version", version)
+    return await pypi_stats_api(endpoint, params, **kwargs)
+
+
+async def system(package: str, os: str | None = None, **kwargs: Any):
+    """Retrieve the aggregate daily download time series by operating system"""
+    endpoint = f"packages/{package}/system"
+    params = pypistats._paramify("os", os)
+    return await pypi_stats_api(endpoint, params, **kwargs)
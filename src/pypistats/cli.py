@@ -5,15 +5,11 @@ CLI with subcommands for pypistats
 from __future__ import annotations
 
 import argparse
-import atexit
-import calendar
-import datetime as dt
+import os
 import re
+import sys
 
 import pypistats
-from pypistats import _cache
-
-atexit.register(_cache.clear)
 
 TYPE_CHECKING = False
 if TYPE_CHECKING:
@@ -31,7 +27,7 @@ def argument(*name_or_flags, **kwargs):
     return list(name_or_flags), kwargs
 
 
-def subcommand(args=None, parent=subparsers):
+def subcommand(args=None, parent=subparsers, name=None):
     """Decorator to define a new subcommand in a sanity-preserving way.
     The function will be stored in the ``func`` variable when the parser
     parses arguments so that it can be called directly like so::
@@ -49,15 +45,19 @@ def subcommand(args=None, parent=subparsers):
 
         $ python cli.py subcommand -d
 
+    The subcommand is named after the function, unless a name is given.
+    Its description is the docstring of the pypistats function of the same name,
+    or of the function itself if there isn't one.
+
     https://mike.depalatis.net/blog/simplifying-argparse.html
     """
     if args is None:
         args = []
 
     def decorator(func) -> None:
-        func2 = getattr(pypistats, func.__name__)
+        func2 = getattr(pypistats, func.__name__, func)
         parser = parent.add_parser(
-            func.__name__,
+            name or func.__name__,
             description=func2.__doc__,
             formatter_class=argparse.ArgumentDefaultsHelpFormatter,
         )
@@ -112,6 +112,8 @@ def _package(value: Any) -> str:
 
 def _month_name_to_yyyy_mm(date_string: str, date_format: str) -> str:
     """Given a month name, return yyyy-dd for the most recent month in the past"""
+    import datetime as dt
+
     today = dt.date.today()
     new = dt.datetime.strptime(
         f"{date_string} {today.year}", f"{date_format} %Y"
@@ -126,6 +128,8 @@ def _month_name_to_yyyy_mm(date_string: str, date_format: str) -> str:
 
 
 def _valid_date(date_string: str, date_format: str) -> str:
+    import datetime as dt
+
     try:
         dt.datetime.strptime(date_string, date_format)
         return date_string
@@ -168,6 +172,25 @@ def _define_format(args: argparse.Namespace) -> str:
     return args.format
 
 
+def _total(args: argparse.Namespace) -> str:
+    """The total from the --daily, --weekly, --monthly, --quarterly and --yearly
+    flags, or all"""
+    for total in ("daily", "weekly", "monthly", "quarterly", "yearly"):
+        if getattr(args, total):
+            return total
+    return "all"
+
+
+def _size(value: str) -> int:
+    """Parse a size like 500000, 500k, 50M or 1G into bytes"""
+    match = re.match(r"^(\d+)([kmg]?)b?$", value.strip().lower())
+    if not match:
+        msg = f"Not a valid size: '{value}'. Expected for example 500k, 50M or 1G."
+        raise argparse.ArgumentTypeError(msg)
+    number, unit = match.groups()
+    return int(number) * 1024 ** " kmg".index(unit or " ")
+
+
 def _python_major_version(value: Any) -> int | None:
     pattern = r"^\d+$"  # x format
     if not re.match(pattern, value):
@@ -187,7 +210,7 @@ def _python_minor_version(value: Any) -> int | None:
     return value
 
 
-FORMATS = ("html", "json", "pretty", "md", "markdown", "rst", "tsv")
+FORMATS = ("html", "json", "pretty", "md", "markdown", "rst", "tsv", "arrow", "parquet")
 
 arg_start_date = argument(
     "-sd",
@@ -221,10 +244,23 @@ arg_this_month = argument(
 )
 arg_json = argument("-j", "--json", action="store_true", help='Shortcut for "-f json"')
 arg_daily = argument("-d", "--daily", action="store_true", help="Show daily downloads")
+arg_weekly = argument(
+    "--weekly", action="store_true", help="Show downloads by ISO week, like 2025-W06"
+)
 arg_monthly = argument("--monthly", action="store_true", help="Show monthly downloads")
+arg_quarterly = argument(
+    "--quarterly", action="store_true", help="Show downloads by quarter, like 2025-Q1"
+)
+arg_yearly = argument("--yearly", action="store_true", help="Show yearly downloads")
 arg_format = argument(
     "-f", "--format", default="pretty", choices=FORMATS, help="The format of output"
 )
+arg_output = argument(
+    "--output",
+    metavar="FILE",
+    help="Write to this file instead of stdout. "
+    "For all, one file per endpoint, like FILE-overall.parquet",
+)
 arg_color = argument(
     "-c",
     "--color",
@@ -235,6 +271,11 @@ arg_color = argument(
 arg_verbose = argument(
     "-v", "--verbose", action="store_true", help="Print debug messages to stderr"
 )
+arg_history = argument(
+    "--history",
+    action="store_true",
+    help="Include downloads kept from earlier runs, older than the API's 180 days",
+)
 arg_sort = argument(
     "-s",
     "--sort",
@@ -259,24 +300,57 @@ common_arguments = [
     arg_last_month,
     arg_this_month,
     arg_daily,
+    arg_weekly,
     arg_monthly,
+    arg_quarterly,
+    arg_yearly,
+    arg_history,
     arg_sort,
+    arg_output,
     arg_color,
     arg_verbose,
 ]
 
 
+def _output(args: argparse.Namespace, output: Any, path: str | None = None) -> None:
+    """Print the output, or write it to the --output file.
+    Arrow and Parquet are binary so can't be printed to a terminal."""
+    path = path or args.output
+    if args.format == "arrow":
+        from pypistats import _arrow
+
+        output = _arrow.to_bytes(output, args.format)
+
+    if isinstance(output, bytes):
+        if path:
+            from pathlib import Path
+
+            Path(path).write_bytes(output)
+        elif sys.stdout.isatty():
+            cli.error(f"-f {args.format} is binary, use --output FILE or a pipe")
+        else:
+            sys.stdout.buffer.write(output)
+    elif path:
+        with open(path, "w", encoding="utf-8") as f:
+            print(output, file=f)
+    else:
+        print(output)
+
+
 @subcommand(
     [
         package_argument,
         argument("-p", "--period", choices=("day", "week", "month")),
         arg_format,
         arg_json,
+        arg_output,
         arg_verbose,
     ]
 )
 def recent(args: argparse.Namespace) -> None:  # pragma: no cover
-    print(pypistats.recent(args.package, period=args.period, format=args.format))
+    _output(
+        args, pypistats.recent(args.package, period=args.period, format=args.format)
+    )
 
 
 @subcommand(
@@ -290,17 +364,19 @@ def overall(args: argparse.Namespace) -> None:  # pragma: no cover
     if args.mirrors in ["with", "without"]:
         args.mirrors = args.mirrors == "with"
 
-    print(
+    _output(
+        args,
         pypistats.overall(
             args.package,
             mirrors=args.mirrors,
             start_date=args.start_date,
             end_date=args.end_date,
             format=args.format,
-            total="daily" if args.daily else ("monthly" if args.monthly else "all"),
+            total=_total(args),
             sort=args.sort,
             color="no",  # Coloured percentages not really helpful here
-        )
+            history=args.history,
+        ),
     )
 
 
@@ -312,17 +388,19 @@ def overall(args: argparse.Namespace) -> None:  # pragma: no cover
     ]
 )
 def python_major(args: argparse.Namespace) -> None:  # pragma: no cover
-    print(
+    _output(
+        args,
         pypistats.python_major(
             args.package,
             version=args.version,
             start_date=args.start_date,
             end_date=args.end_date,
             format=args.format,
-            total="daily" if args.daily else ("monthly" if args.monthly else "all"),
+            total=_total(args),
             sort=args.sort,
             color=args.color,
-        )
+            history=args.history,
+        ),
     )
 
 
@@ -334,17 +412,19 @@ def python_major(args: argparse.Namespace) -> None:  # pragma: no cover
     ]
 )
 def python_minor(args: argparse.Namespace) -> None:  # pragma: no cover
-    print(
+    _output(
+        args,
         pypistats.python_minor(
             args.package,
             version=args.version,
             start_date=args.start_date,
             end_date=args.end_date,
             format=args.format,
-            total="daily" if args.daily else ("monthly" if args.monthly else "all"),
+            total=_total(args),
             sort=args.sort,
             color=args.color,
-        )
+            history=args.history,
+        ),
     )
 
 
@@ -356,22 +436,175 @@ def python_minor(args: argparse.Namespace) -> None:  # pragma: no cover
     ]
 )
 def system(args: argparse.Namespace) -> None:  # pragma: no cover
-    print(
+    _output(
+        args,
         pypistats.system(
             args.package,
             os=args.os,
             start_date=args.start_date,
             end_date=args.end_date,
             format=args.format,
-            total="daily" if args.daily else ("monthly" if args.monthly else "all"),
+            total=_total(args),
             sort=args.sort,
             color=args.color,
-        )
+            history=args.history,
+        ),
     )
 
 
+@subcommand([package_argument, *common_arguments], name="all")
+def bundle(args: argparse.Namespace) -> None:  # pragma: no cover
+    stats = pypistats.bundle(args.package, history=args.history)
+
+    outputs = {}
+    for endpoint, package_stats in stats.items():
+        if endpoint == "recent":
+            outputs[endpoint] = package_stats.view(format=args.format, color=args.color)
+        else:
+            outputs[endpoint] = package_stats.view(
+                format=args.format,
+                start_date=args.start_date,
+                end_date=args.end_date,
+                total=_total(args),
+                sort=args.sort,
+                color="no" if endpoint == "overall" else args.color,
+            )
+
+    if args.format == "json":
+        import json
+
+        _output(args, json.dumps({k: json.loads(v) for k, v in outputs.items()}))
+    elif args.format in ("arrow", "parquet"):
+        from pathlib import Path
+
+        if not args.output:
+            cli.error(f"-f {args.format} needs --output FILE for all endpoints")
+        path = Path(args.output)
+        for endpoint, output in outputs.items():
+            _output(args, output, str(path.with_stem(f"{path.stem}-{endpoint}")))
+    else:
+        _output(
+            args,
+            "\n".join(f"{endpoint}\n{output}" for endpoint, output in outputs.items()),
+        )
+
+
+cache_parser = subparsers.add_parser("cache", description="Manage the cache")
+cache_subparsers = cache_parser.add_subparsers(dest="cache_subcommand")
+cache_parser.set_defaults(func=lambda args: cache_parser.print_help())
+
+
+@subcommand(
+    [
+        argument(
+            "--max-size",
+            type=_size,
+            metavar="SIZE",
+            help="Delete the least recently used entries until the cache is no "
+            "bigger than this, eg. 500k, 50M or 1G",
+        ),
+        argument(
+            "--max-age",
+            type=int,
+            metavar="DAYS",
+            help="Delete entries not used for this many days",
+        ),
+    ],
+    parent=cache_subparsers,
+    name="prune",
+)
+def prune_cache(args: argparse.Namespace) -> None:  # pragma: no cover
+    """Delete cache entries by age and size. Without limits, delete entries
+    not from this month."""
+    from pypistats import _cache
+
+    if args.max_size is None and args.max_age is None:
+        _cache.clear()
+        return
+
+    count, nbytes = _cache.prune(max_bytes=args.max_size, max_age=args.max_age)
+    print(f"Deleted {count} entries, {nbytes:,} bytes")
+
+
+@subcommand(parent=cache_subparsers, name="info")
+def show_cache_info(args: argparse.Namespace) -> None:  # pragma: no cover
+    """Show where the cache is, its size, and how often it's been used"""
+    from pypistats import _cache
+
+    usage = _cache.backend.usage()
+    counts = _cache.counters.load()
+    lookups = counts["hits"] + counts["misses"]
+    hit_rate = f"{counts['hits'] / lookups:.1%}" if lookups else "n/a"
+    max_size = "none" if _cache.MAX_BYTES is None else f"{_cache.MAX_BYTES:,} bytes"
+
+    print(f"Location: {usage.location}")
+    print(f"Entries:  {usage.entries:,}")
+    print(f"Size:     {usage.bytes:,} bytes")
+    print(f"Max size: {max_size}")
+    print(f"Hits:     {counts['hits']:,}")
+    print(f"Misses:   {counts['misses']:,}")
+    print(f"Hit rate: {hit_rate}")
+
+
+@subcommand(parent=cache_subparsers, name="clear")
+def clear_cache(args: argparse.Namespace) -> None:  # pragma: no cover
+    """Delete all cached responses and reset the hit and miss counts.
+    History is kept."""
+    from pypistats import _cache
+
+    _cache.clear_all()
+    _cache.counters.reset()
+
+
+@subcommand(
+    [
+        argument("packages", nargs="+", metavar="package", help="package names"),
+        argument("-e", "--endpoint", default="overall", choices=pypistats.ENDPOINTS),
+        argument(
+            "-w", "--workers", type=int, default=8, help="Packages to fetch at once"
+        ),
+        argument("--rate", type=float, help="Most requests a second"),
+        argument(
+            "--retries",
+            type=int,
+            default=3,
+            help="Times to retry rate limited and server error responses, "
+            "backing off between tries",
+        ),
+    ],
+    parent=cache_subparsers,
+    name="warm",
+)
+def warm_cache(args: argparse.Namespace) -> None:  # pragma: no cover
+    """Fetch packages in parallel into the cache, so later runs needn't wait"""
+    import sys
+
+    failed = 0
+    with pypistats.Client(
+        maxsize=args.workers, retries=args.retries, rate=args.rate
+    ) as client:
+        for result in pypistats.fetch_many(
+            args.packages,
+            args.endpoint,
+            workers=args.workers,
+            client=client,
+            format=None,
+        ):
+            if result.error is None:
+                print(f"{result.package}: cached")
+            else:
+                failed += 1
+                print(f"{result.package}: {result.error}", file=sys.stderr)
+
+    if failed:
+        sys.exit(1)
+
+
 def _month(yyyy_mm: str) -> tuple[str, str]:
     """Helper to return start_date and end_date of a month as yyyy-mm-dd"""
+    import calendar
+    import datetime as dt
+
     year, month = map(int, yyyy_mm.split("-"))
     first = dt.date(year, month, 1)
     last_day = calendar.monthrange(year, month)[1]
@@ -381,6 +614,8 @@ def _month(yyyy_mm: str) -> tuple[str, str]:
 
 def _last_month() -> tuple[str, str]:
     """Helper to return start_date and end_date of the previous month as yyyy-mm-dd"""
+    import datetime as dt
+
     today = dt.date.today()
     # Go to previous month
     if today.month == 1:
@@ -393,6 +628,8 @@ def _last_month() -> tuple[str, str]:
 def _this_month() -> str:
     """Helper to return start_date of the current month as yyyy-mm-dd.
     No end_date needed."""
+    import datetime as dt
+
     today = dt.date.today()
     return _month(today.isoformat()[:7])[0]
 
@@ -402,9 +639,25 @@ def main() -> None:
         "-V", "--version", action="version", version=f"%(prog)s {pypistats.__version__}"
     )
     args = cli.parse_args()
+
     if args.subcommand is None:
         cli.print_help()
     else:
+        import atexit
+
+        from pypistats import _cache
+
+        max_size = os.environ.get("PYPISTATS_CACHE_MAX_SIZE")
+        if max_size:
+            try:
+                _cache.MAX_BYTES = _size(max_size)
+            except argparse.ArgumentTypeError as e:
+                cli.error(f"PYPISTATS_CACHE_MAX_SIZE: {e}")
+
+        # Registered here rather than on import, so --help and --version
+        # don't need the cache
+        atexit.register(_cache.tidy)
+
         # Convert yyyy-mm to yyyy-mm-dd
         if hasattr(args, "start_date") and args.start_date:
             try:
@@ -430,9 +683,14 @@ def main() -> None:
         elif hasattr(args, "this_month") and args.this_month:
             args.start_date = _this_month()
 
-        args.format = _define_format(args)
+        if hasattr(args, "format"):
+            args.format = _define_format(args)
+
+        # Colours are for terminals, not files
+        if getattr(args, "output", None) and getattr(args, "color", None) == "auto":
+            args.color = "no"
 
-        pypistats._verbose = args.verbose
+        pypistats._verbose = getattr(args, "verbose", False)
 
         args.func(args)
 
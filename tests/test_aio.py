@@ -0,0 +1,256 @@
+"""
+Unit tests for the asynchronous interface
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gc
+import json
+import weakref
+from unittest import mock
+
+import pytest
+
+import pypistats
+from pypistats import _cache
+
+from .test_pypistats import (
+    SAMPLE_RESPONSE_OVERALL,
+    stub__cache_filename,
+    stub__save_cache,
+)
+
+aiohttp = pytest.importorskip("aiohttp", reason="aiohttp is not installed")
+aio = pytest.importorskip("pypistats.aio")
+
+
+def mock_client(content: str, status: int = 200) -> mock.Mock:
+    """Helper to create a mock client returning the content for every URL."""
+    client = mock.Mock(spec=aio.Client)
+    client.get = mock.AsyncMock(return_value=(status, content.encode()))
+    return client
+
+
+class TestAio:
+    def setup_method(self) -> None:
+        # Stub caching. Caches are tested in another class.
+        pypistats.cache_clear()
+        self.original__cache_filename = _cache.filename
+        self.original__save_cache = _cache.save
+        _cache.filename = stub__cache_filename  # type: ignore[assignment]
+        _cache.save = stub__save_cache  # type: ignore[assignment]
+
+    def teardown_method(self) -> None:
+        # Unstub caching
+        _cache.filename = self.original__cache_filename
+        _cache.save = self.original__save_cache
+
+    def test_overall(self) -> None:
+        # Arrange
+        client = mock_client(SAMPLE_RESPONSE_OVERALL)
+
+        # Act
+        output = asyncio.run(aio.overall("pip", format=None, client=client))
+
+        # Assert
+        assert output[0] == {
+            "category": "with_mirrors",
+            "downloads": 3587357,
+            "percent": "100.00%",
+        }
+        client.get.assert_awaited_once_with(
+            "https://pypistats.org/api/packages/pip/overall"
+        )
+
+    def test_same_processing_as_sync(self) -> None:
+        # Arrange
+        client = mock_client(SAMPLE_RESPONSE_OVERALL)
+
+        # Act
+        output = asyncio.run(
+            aio.overall(
+                "pip",
+                mirrors=True,
+                start_date="2020-05-02",
+                total="daily",
+                format="json",
+                client=client,
+            )
+        )
+
+        # Assert
+        assert json.loads(output)["data"] == [
+            {"category": "with_mirrors", "date": "2020-05-02", "downloads": 1487218},
+            {"category": "without_mirrors", "date": "2020-05-02", "downloads": 1475979},
+        ]
+        client.get.assert_awaited_once_with(
+            "https://pypistats.org/api/packages/pip/overall?&mirrors=true"
+        )
+
+    @pytest.mark.parametrize(
+        "func, arg, expected_url",
+        [
+            ("recent", "day", "packages/pip/recent?&period=day"),
+            ("python_major", "3", "packages/pip/python_major?&version=3"),
+            ("python_minor", "3.7", "packages/pip/python_minor?&version=3.7"),
+            ("system", "linux", "packages/pip/system?&os=linux"),
+        ],
+    )
+    def test_endpoints(self, func: str, arg: str, expected_url: str) -> None:
+        # Arrange
+        client = mock_client(SAMPLE_RESPONSE_OVERALL)
+
+        # Act
+        asyncio.run(getattr(aio, func)("pip", arg, client=client))
+
+        # Assert
+        client.get.assert_awaited_once_with("https://pypistats.org/api/" + expected_url)
+
+    def test_http_error(self) -> None:
+        # Arrange
+        client = mock_client("Not Found", status=404)
+
+        # Act / Assert
+        with pytest.raises(Exception, match="HTTP Error 404"):
+            asyncio.run(aio.python_minor("pip", client=client))
+
+    def test_warning_points_at_caller(self) -> None:
+        # Arrange
+        client = mock_client(SAMPLE_RESPONSE_OVERALL)
+
+        async def run() -> None:
+            await aio.overall("pip", start_date="2000-01-01", client=client)
+
+        # Act
+        with pytest.warns(UserWarning, match="Requested start date") as record:
+            asyncio.run(run())
+
+        # Assert
+        assert record[0].filename == __file__
+
+    def test_default_client_per_loop(self) -> None:
+        # Arrange
+        async def run() -> list:
+            with (
+                mock.patch.object(pypistats, "_load_cache", return_value=None),
+                mock.patch.object(
+                    aio.Client,
+                    "get",
+                    autospec=True,
+                    return_value=(200, SAMPLE_RESPONSE_OVERALL.encode()),
+                ) as mock_get,
+            ):
+                await aio.overall("pip")
+                await aio.overall("pip", mirrors=True)
+            clients = [call.args[0] for call in mock_get.await_args_list]
+            # Open a session, to be closed when the loop shuts down
+            assert not clients[0].session.closed
+            return clients
+
+        # Act
+        first = asyncio.run(run())
+        second = asyncio.run(run())
+
+        # Assert
+        assert first[0] is first[1]
+        assert second[0] is second[1]
+        assert first[0] is not second[0]
+        assert first[0]._session is not None
+        assert first[0]._session.closed
+
+    def test_default_client_released_at_shutdown(self) -> None:
+        # Arrange
+        async def run() -> weakref.ref:
+            client = await aio.default_client()
+            # Open a session, which refers to the loop
+            assert not client.session.closed
+            return weakref.ref(client)
+
+        loop = asyncio.new_event_loop()
+        loop_ref = weakref.ref(loop)
+
+        # Act
+        client_ref = loop.run_until_complete(run())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+        del loop
+        gc.collect()
+
+        # Assert
+        assert client_ref() is None
+        assert loop_ref() is None
+        assert len(aio._default_clients) == 0
+
+    def test_client_limits_concurrency(self) -> None:
+        # Arrange
+        in_flight = 0
+        max_in_flight = 0
+
+        class Response:
+            status = 200
+
+            async def __aenter__(self):
+                nonlocal in_flight, max_in_flight
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+                await asyncio.sleep(0.01)
+                return self
+
+            async def __aexit__(self, *args) -> None:
+                nonlocal in_flight
+                in_flight -= 1
+
+            async def read(self) -> bytes:
+                return SAMPLE_RESPONSE_OVERALL.encode()
+
+        async def run() -> None:
+            async with aio.Client(limit=2) as client:
+                with mock.patch.object(
+                    aiohttp.ClientSession, "get", return_value=Response()
+                ):
+                    await asyncio.gather(
+                        *(aio.overall(f"pkg{i}", client=client) for i in range(6))
+                    )
+
+        # Act
+        asyncio.run(run())
+
+        # Assert
+        assert max_in_flight == 2
+
+    def test_client_retries_status(self) -> None:
+        # Arrange
+        statuses = [503, 200]
+
+        class Response:
+            headers = {"Retry-After": "2"}
+
+            async def __aenter__(self):
+                self.status = statuses.pop(0)
+                return self
+
+            async def __aexit__(self, *args) -> None:
+                pass
+
+            async def read(self) -> bytes:
+                return SAMPLE_RESPONSE_OVERALL.encode()
+
+        async def run() -> tuple[int, bytes]:
+            async with aio.Client() as client:
+                with (
+                    mock.patch.object(
+                        aiohttp.ClientSession, "get", return_value=Response()
+                    ),
+                    mock.patch("asyncio.sleep") as mock_sleep,
+                ):
+                    result = await client.get("https://example.com")
+                mock_sleep.assert_awaited_once_with(2.0)
+                return result
+
+        # Act
+        status, _ = asyncio.run(run())
+
+        # Assert
+        assert status == 200
+        assert statuses == []
@@ -4,16 +4,20 @@ Unit tests for cache
 
 from __future__ import annotations
 
+import json
+import os
 import tempfile
+import time
 from pathlib import Path
 from unittest import mock
 
+import pytest
 from freezegun import freeze_time
 
 import pypistats
 from pypistats import _cache
 
-from .test_pypistats import mock_urllib3_response
+from .test_pypistats import SAMPLE_RESPONSE_OVERALL, mock_urllib3_response
 
 
 class TestCache:
@@ -22,6 +26,7 @@ class TestCache:
         self.original_cache_dir = _cache.CACHE_DIR
         self.temp_dir = tempfile.TemporaryDirectory()
         _cache.CACHE_DIR = Path(self.temp_dir.name) / "pypistats"
+        pypistats.cache_clear()
 
     def teardown_method(self) -> None:
         # Reset original
@@ -36,9 +41,49 @@ class TestCache:
         out = _cache.filename(url)
 
         # Assert
-        assert str(out).endswith(
-            "2018-12-26-https-pypistats-org-api-packages-pip-recent.json"
+        assert str(out).endswith("2018-12-26-v2-recent-9867edad3749ba92.json")
+
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "https://pypistats.org/api/packages/pip/overall?mirrors=true",
+            "https://pypistats.org/api/packages/Pip/overall?&mirrors=true",
+            "https://pypistats.org/api/packages/pip/overall/?mirrors=true&",
+        ],
+    )
+    def test_key_normalized(self, url: str) -> None:
+        # Act / Assert
+        assert _cache.key(url) == "v2-overall-572c11f0a6926421"
+
+    def test_key_params_sorted(self) -> None:
+        # Arrange
+        url = "https://pypistats.org/api/packages/pip/python_minor"
+
+        # Act / Assert
+        assert _cache.key(f"{url}?a=1&b=2") == _cache.key(f"{url}?b=2&a=1")
+        assert _cache.key(f"{url}?a=1&b=2") != _cache.key(f"{url}?a=2&b=1")
+
+    @freeze_time("2018-12-26")
+    def test_load_legacy_cache(self) -> None:
+        # Arrange
+        url = "https://pypistats.org/api/packages/pip/recent"
+        legacy_file = (
+            _cache.CACHE_DIR
+            / "2018-12-26-https-pypistats-org-api-packages-pip-recent.json"
         )
+        _cache.save(legacy_file, {"legacy": True})
+        # Never compressed, whatever's used for new files
+        pypistats.configure_cache(compression="gzip")
+
+        # Act
+        try:
+            cached = _cache.backend.get(url)
+        finally:
+            pypistats.configure_cache(compression=None)
+
+        # Assert
+        assert cached is not None
+        assert cached[0] == {"legacy": True}
 
     def test_load_cache_not_exist(self) -> None:
         # Arrange
@@ -89,7 +134,7 @@ class TestCache:
         # Assert
         assert not cache_file.exists()
 
-    @mock.patch("urllib3.request")
+    @mock.patch("urllib3.PoolManager.request")
     def test_subcommand_with_cache(self, mock_request) -> None:
         # Arrange
         package = "pip"
@@ -117,3 +162,733 @@ Date range: 2018-11-01 - 2018-11-01
 
         # Assert
         assert output.strip() == expected_output.strip()
+
+    @mock.patch("urllib3.PoolManager.request")
+    def test_bundle_with_cache(self, mock_request) -> None:
+        # Arrange
+        mock_request.return_value = mock_urllib3_response(
+            '{"data": {"last_day": 1}, "package": "pip", "type": "recent_downloads"}'
+        )
+
+        # Act
+        # First time to save to cache
+        pypistats.bundle("pip")
+        # Second time to read from cache
+        stats = pypistats.bundle("pip")
+
+        # Assert
+        assert mock_request.call_count == len(pypistats.ENDPOINTS)
+        assert len(list(_cache.CACHE_DIR.glob("*.json"))) == 1
+        assert stats["recent"].view() == {"last_day": 1}
+
+    @mock.patch("urllib3.PoolManager.request")
+    def test_memory_cache(self, mock_request) -> None:
+        # Arrange
+        mock_request.return_value = mock_urllib3_response(
+            '{"data": {"last_day": 1}, "package": "pip", "type": "recent_downloads"}'
+        )
+        pypistats.recent("pip")
+        # Remove the cache file, to check the second call doesn't need it
+        for cache_file in _cache.CACHE_DIR.glob("*.json"):
+            cache_file.unlink()
+
+        # Act
+        output = pypistats.recent("pip", format=None)
+
+        # Assert
+        assert output == {"last_day": 1}
+        assert mock_request.call_count == 1
+        info = pypistats.cache_info()
+        assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+
+    def test_memory_cache_evicts_least_recently_used(self) -> None:
+        # Arrange
+        memory = _cache.MemoryCache(maxsize=2, maxbytes=100)
+        memory.set("a", {"a": 1}, 10)
+        memory.set("b", {"b": 1}, 10)
+        memory.get("a")
+
+        # Act
+        memory.set("c", {"c": 1}, 10)
+
+        # Assert
+        assert memory.get("a") == {"a": 1}
+        assert memory.get("b") is None
+        assert memory.get("c") == {"c": 1}
+
+    def test_memory_cache_bounded_by_bytes(self) -> None:
+        # Arrange
+        memory = _cache.MemoryCache(maxsize=10, maxbytes=100)
+        memory.set("a", {"a": 1}, 60)
+
+        # Act
+        memory.set("b", {"b": 1}, 60)
+        memory.set("too-big", {"c": 1}, 101)
+
+        # Assert
+        assert memory.get("a") is None
+        assert memory.get("b") == {"b": 1}
+        assert memory.get("too-big") is None
+        assert memory.info().currbytes == 60
+
+    def test_memory_cache_new_day(self) -> None:
+        # Arrange
+        memory = _cache.MemoryCache()
+        with freeze_time("2018-12-26 23:59"):
+            memory.set("a", {"a": 1}, 10)
+
+        # Act
+        with freeze_time("2018-12-27 00:01"):
+            data = memory.get("a")
+
+        # Assert
+        assert data is None
+
+    def test_configure_cache(self) -> None:
+        # Arrange
+        _cache.memory.set("a", {"a": 1}, 10)
+        _cache.memory.set("b", {"b": 1}, 10)
+        original = _cache.memory.maxsize
+
+        # Act
+        pypistats.configure_cache(memory_maxsize=1)
+
+        # Assert
+        try:
+            assert _cache.memory.info().currsize == 1
+            assert _cache.memory.get("b") == {"b": 1}
+        finally:
+            pypistats.configure_cache(memory_maxsize=original)
+
+    @mock.patch("urllib3.PoolManager.request")
+    def test_revalidate_not_modified(self, mock_request) -> None:
+        # Arrange
+        mock_request.return_value = mock_urllib3_response(
+            SAMPLE_RESPONSE_OVERALL, headers={"ETag": '"abc"'}
+        )
+        with freeze_time("2018-12-26"):
+            expected = pypistats.overall("pip", format=None)
+        pypistats.cache_clear()
+        mock_request.reset_mock()
+        mock_request.return_value = mock_urllib3_response("", status=304)
+
+        # Act
+        with freeze_time("2018-12-27"):
+            output = pypistats.overall("pip", format=None)
+            cache_file = _cache.filename(
+                "https://pypistats.org/api/packages/pip/overall"
+            )
+
+        # Assert
+        assert output == expected
+        mock_request.assert_called_once_with(
+            "GET",
+            "https://pypistats.org/api/packages/pip/overall",
+            headers={"User-Agent": pypistats.USER_AGENT, "If-None-Match": '"abc"'},
+        )
+        assert cache_file.exists()
+
+    @mock.patch("urllib3.PoolManager.request")
+    def test_revalidate_modified(self, mock_request) -> None:
+        # Arrange
+        mock_request.return_value = mock_urllib3_response(
+            SAMPLE_RESPONSE_OVERALL,
+            headers={"Last-Modified": "Wed, 26 Dec 2018 00:00:00 GMT"},
+        )
+        with freeze_time("2018-12-26"):
+            pypistats.overall("pip", format=None)
+        pypistats.cache_clear()
+        mock_request.return_value = mock_urllib3_response(
+            '{"data": [{"category": "with_mirrors", "date": "2018-12-27", '
+            '"downloads": 1}], "package": "pip", "type": "overall_downloads"}'
+        )
+
+        # Act
+        with freeze_time("2018-12-27"):
+            output = pypistats.overall("pip", format=None)
+
+        # Assert
+        assert output == [{"category": "with_mirrors", "downloads": 1}]
+        assert mock_request.call_args.kwargs["headers"]["If-Modified-Since"] == (
+            "Wed, 26 Dec 2018 00:00:00 GMT"
+        )
+
+    @mock.patch("urllib3.PoolManager.request")
+    def test_revalidate_still_fresh(self, mock_request) -> None:
+        # Arrange
+        mock_request.return_value = mock_urllib3_response(
+            SAMPLE_RESPONSE_OVERALL, headers={"Cache-Control": "max-age=3600"}
+        )
+        with freeze_time("2018-12-26 23:30"):
+            expected = pypistats.overall("pip", format=None)
+        pypistats.cache_clear()
+
+        # Act
+        with freeze_time("2018-12-27 00:15"):
+            output = pypistats.overall("pip", format=None)
+
+        # Assert
+        assert output == expected
+        assert mock_request.call_count == 1
+
+    def test_cache_clear_keeps_this_months_validators(self) -> None:
+        # Arrange
+        url = "https://pypistats.org/api/packages/pip/overall"
+        cache_file = _cache.filename(url)
+        _cache.save(cache_file, data={"data": []})
+        _cache.save_validators(url, cache_file, {"etag": '"abc"'})
+
+        # Act
+        _cache.clear()
+
+        # Assert
+        assert _cache.validators_filename(url).exists()
+
+    @pytest.mark.parametrize("compression", ["gzip", "zstd"])
+    def test_cache_round_trip_compressed(self, compression: str) -> None:
+        # Arrange
+        if compression == "zstd":
+            try:
+                _cache._zstd()
+            except ImportError:
+                pytest.skip("zstd is not available")
+        url = "https://pypistats.org/api/packages/pip/recent"
+        data = {"test": "data"}
+        pypistats.configure_cache(compression=compression)
+
+        # Act
+        try:
+            filename = _cache.filename(url)
+            _cache.save(filename, data)
+        finally:
+            pypistats.configure_cache(compression=None)
+        # Detected from the extension, not the current setting
+        new_data = _cache.load(filename)
+
+        # Assert
+        assert filename.name.endswith(_cache.COMPRESSIONS[compression])
+        assert filename.read_bytes() != b'{"test": "data"}'
+        assert new_data == data
+
+    def test_backend_get_compressed_size(self) -> None:
+        # Arrange
+        url = "https://pypistats.org/api/packages/pip/overall"
+        data = {"data": [{"category": "with_mirrors", "downloads": 1}] * 100}
+        backend = _cache.JSONFilesBackend()
+        pypistats.configure_cache(compression="gzip")
+
+        # Act
+        try:
+            backend.set(url, data, {"etag": '"abc"'})
+            cached = backend.get(url)
+            previous = backend.get_previous(url)
+        finally:
+            pypistats.configure_cache(compression=None)
+
+        # Assert
+        # The size of the JSON, not of the smaller compressed file
+        assert cached == (data, len(json.dumps(data)))
+        assert previous["nbytes"] == len(json.dumps(data))
+
+    @pytest.mark.parametrize("saved, current", [("gzip", None), (None, "gzip")])
+    def test_backend_get_other_compression(
+        self, saved: str | None, current: str | None
+    ) -> None:
+        # Arrange
+        url = "https://pypistats.org/api/packages/pip/overall"
+        backend = _cache.JSONFilesBackend()
+        pypistats.configure_cache(compression=saved)
+        try:
+            backend.set(url, {"data": []})
+
+            # Act
+            pypistats.configure_cache(compression=current)
+            cached = backend.get(url)
+        finally:
+            pypistats.configure_cache(compression=None)
+
+        # Assert
+        assert cached == ({"data": []}, len('{"data": []}'))
+
+    def test_backend_get_read_only(self) -> None:
+        # Arrange
+        url = "https://pypistats.org/api/packages/pip/overall"
+        backend = _cache.JSONFilesBackend()
+        backend.set(url, {"data": []})
+
+        # Act
+        with mock.patch("os.utime", side_effect=PermissionError):
+            cached = backend.get(url)
+
+        # Assert
+        assert cached == ({"data": []}, len('{"data": []}'))
+
+    def test_load_cache_bad_compressed_data(self) -> None:
+        # Arrange
+        filename = _cache.CACHE_DIR / "bad.json.gz"
+        filename.parent.mkdir(parents=True)
+        filename.write_bytes(b"Not gzip!")
+
+        # Act
+        data = _cache.load(filename)
+
+        # Assert
+        assert data == {}
+
+    def test_configure_cache_invalid_compression(self) -> None:
+        # Act / Assert
+        with pytest.raises(ValueError, match="compression must be one of"):
+            pypistats.configure_cache(compression="lzma")
+
+    def test_cache_clear_compressed(self) -> None:
+        # Arrange
+        cache_file = _cache.CACHE_DIR / "2018-11-26-old-cache-file.json.gz"
+        _cache.save(cache_file, data={})
+        assert cache_file.exists()
+
+        # Act
+        _cache.clear()
+
+        # Assert
+        assert not cache_file.exists()
+
+    def test_sqlite_round_trip(self) -> None:
+        # Arrange
+        backend = _cache.SQLiteBackend()
+        url = "https://pypistats.org/api/packages/pip/recent"
+        data = {"test": "data"}
+
+        # Act
+        with freeze_time("2018-12-26"):
+            backend.set(url, data)
+            cached = backend.get(url)
+        with freeze_time("2018-12-27"):
+            cached_next_day = backend.get(url)
+
+        # Assert
+        assert cached == (data, len('{"test": "data"}'))
+        assert cached_next_day is None
+        assert (_cache.CACHE_DIR / "cache.sqlite3").exists()
+
+    def test_sqlite_previous(self) -> None:
+        # Arrange
+        backend = _cache.SQLiteBackend()
+        url = "https://pypistats.org/api/packages/pip/recent"
+        with freeze_time("2018-12-25"):
+            backend.set(url, {"day": 25}, {"etag": '"25"'})
+        with freeze_time("2018-12-26"):
+            backend.set(url, {"day": 26}, {"etag": '"26"'})
+            backend.set("https://example.com", {"no": "validators"})
+
+        # Act
+        previous = backend.get_previous(url)
+        no_previous = backend.get_previous("https://example.com")
+
+        # Assert
+        assert previous["etag"] == '"26"'
+        assert previous["data"] == {"day": 26}
+        assert no_previous == {}
+
+    def test_sqlite_clear(self) -> None:
+        # Arrange
+        backend = _cache.SQLiteBackend()
+        with freeze_time("2018-11-30"):
+            backend.set("old", {"old": 1})
+        with freeze_time("2018-12-26"):
+            backend.set("new", {"new": 1})
+
+            # Act
+            backend.clear()
+
+            # Assert
+            assert backend.get("new") is not None
+        with freeze_time("2018-11-30"):
+            assert backend.get("old") is None
+
+    @mock.patch("urllib3.PoolManager.request")
+    def test_sqlite_backend_configured(self, mock_request) -> None:
+        # Arrange
+        mock_request.return_value = mock_urllib3_response(
+            SAMPLE_RESPONSE_OVERALL, headers={"ETag": '"abc"'}
+        )
+        original = _cache.backend
+        pypistats.configure_cache(backend="sqlite")
+
+        # Act
+        try:
+            with freeze_time("2018-12-26"):
+                expected = pypistats.overall("pip", format=None)
+            pypistats.cache_clear()
+            mock_request.return_value = mock_urllib3_response("", status=304)
+            with freeze_time("2018-12-27"):
+                output = pypistats.overall("pip", format=None)
+        finally:
+            _cache.backend = original
+
+        # Assert
+        assert output == expected
+        assert mock_request.call_args.kwargs["headers"]["If-None-Match"] == '"abc"'
+        assert list(_cache.CACHE_DIR.glob("*.json")) == []
+
+    def test_configure_cache_invalid_backend(self) -> None:
+        # Act / Assert
+        with pytest.raises(ValueError, match="backend must be one of"):
+            pypistats.configure_cache(backend="redis")
+
+    def test_backend_incomplete(self) -> None:
+        # Arrange
+        class Backend(_cache.Backend):
+            def get(self, url: str) -> tuple[dict, int] | None:
+                return None
+
+        # Act / Assert
+        with pytest.raises(TypeError, match="abstract method"):
+            Backend()  # type: ignore[abstract]
+
+    def test_maybe_clear_once_a_day(self) -> None:
+        # Arrange
+        with mock.patch.object(_cache, "clear") as mock_clear:
+            # Act
+            with freeze_time("2018-12-26"):
+                _cache.maybe_clear()
+                _cache.maybe_clear()
+            with freeze_time("2018-12-27"):
+                _cache.maybe_clear()
+
+        # Assert
+        assert mock_clear.call_count == 2
+
+    def test_prune_max_age(self) -> None:
+        # Arrange
+        old_file = _cache.CACHE_DIR / "2018-11-26-old.json"
+        new_file = _cache.CACHE_DIR / "2018-12-26-new.json"
+        _cache.save(old_file, data={"old": 1})
+        _cache.save(new_file, data={"new": 1})
+        week_ago = time.time() - 7 * 24 * 60 * 60
+        os.utime(old_file, (week_ago, week_ago))
+
+        # Act
+        count, nbytes = _cache.prune(max_age=3)
+
+        # Assert
+        assert (count, nbytes) == (1, len('{"old": 1}'))
+        assert not old_file.exists()
+        assert new_file.exists()
+
+    def test_prune_max_size(self) -> None:
+        # Arrange
+        files = [_cache.CACHE_DIR / f"2018-12-2{i}-file.json" for i in range(3)]
+        for i, cache_file in enumerate(files):
+            _cache.save(cache_file, data={"i": i})
+            os.utime(cache_file, (1_000_000 + i, 1_000_000 + i))
+
+        # Act
+        count, _ = _cache.prune(max_bytes=2 * len('{"i": 0}'))
+
+        # Assert
+        assert count == 1
+        assert [cache_file.exists() for cache_file in files] == [False, True, True]
+
+    def test_sqlite_prune(self) -> None:
+        # Arrange
+        backend = _cache.SQLiteBackend()
+        for day in (24, 25, 26):
+            with freeze_time(f"2018-12-{day}"):
+                backend.set("url", {"day": day})
+
+        # Act
+        with freeze_time("2018-12-26"):
+            by_age = backend.prune(max_age=1)
+            by_size = backend.prune(max_bytes=len('{"day": 26}'))
+
+        # Assert
+        assert by_age == (1, len('{"day": 24}'))
+        assert by_size == (1, len('{"day": 25}'))
+        with freeze_time("2018-12-26"):
+            assert backend.get("url") is not None
+
+    def test_prune_least_recently_used(self) -> None:
+        # Arrange
+        urls = [f"https://pypistats.org/api/packages/pkg{i}/recent" for i in range(3)]
+        for i, url in enumerate(urls):
+            _cache.backend.set(url, {"i": i})
+            os.utime(_cache.filename(url), (1_000_000 + i, 1_000_000 + i))
+        # Use the oldest
+        _cache.lookup(urls[0])
+
+        # Act
+        _cache.prune(max_bytes=2 * len('{"i": 0}'))
+
+        # Assert
+        assert [_cache.filename(url).exists() for url in urls] == [True, False, True]
+
+    def test_sqlite_get_marks_used_hourly(self) -> None:
+        # Arrange
+        backend = _cache.SQLiteBackend()
+
+        def accessed() -> float:
+            query = "SELECT accessed FROM responses WHERE url = 'a'"
+            return backend._connection().execute(query).fetchone()[0]
+
+        with freeze_time("2018-12-26 00:00"):
+            backend.set("a", {"a": 1})
+            set_at = accessed()
+
+        # Act
+        with freeze_time("2018-12-26 00:59"):
+            backend.get("a")
+            within_hour = accessed()
+        with freeze_time("2018-12-26 01:00"):
+            backend.get("a")
+            after_hour = accessed()
+
+        # Assert
+        assert within_hour == set_at
+        assert after_hour == set_at + _cache.ACCESSED_INTERVAL
+
+    def test_sqlite_prune_least_recently_used(self) -> None:
+        # Arrange
+        backend = _cache.SQLiteBackend()
+        with freeze_time("2018-12-26 00:00"):
+            backend.set("a", {"a": 1})
+        with freeze_time("2018-12-26 01:00"):
+            backend.set("b", {"b": 1})
+        with freeze_time("2018-12-26 02:00"):
+            backend.get("a")
+
+            # Act
+            deleted = backend.prune(max_bytes=len('{"a": 1}'))
+
+            # Assert
+            assert deleted == (1, len('{"b": 1}'))
+            assert backend.get("a") is not None
+            assert backend.get("b") is None
+
+    def test_usage(self) -> None:
+        # Arrange
+        _cache.backend.set("https://pypistats.org/api/packages/pip/recent", {"a": 1})
+        _cache.save(_cache.CACHE_DIR / "history" / "pip.json", {"kept": True})
+
+        # Act
+        usage = _cache.backend.usage()
+
+        # Assert
+        assert usage == (str(_cache.CACHE_DIR), 1, len('{"a": 1}'))
+
+    @pytest.mark.parametrize("backend", ["json", "sqlite"])
+    def test_clear_all(self, backend: str) -> None:
+        # Arrange
+        original = _cache.backend
+        pypistats.configure_cache(backend=backend)
+        url = "https://pypistats.org/api/packages/pip/recent"
+        history_file = _cache.CACHE_DIR / "history" / "pip.json"
+        _cache.save(history_file, {"kept": True})
+
+        # Act
+        try:
+            _cache.store(url, {"a": 1}, {"etag": '"abc"'})
+            _cache.clear_all()
+            usage = _cache.backend.usage()
+            previous = _cache.backend.get_previous(url)
+        finally:
+            _cache.backend = original
+
+        # Assert
+        assert usage.entries == 0
+        assert previous == {}
+        assert history_file.exists()
+
+    def test_counters_saved(self) -> None:
+        # Arrange
+        url = "https://pypistats.org/api/packages/pip/recent"
+        counters = _cache.Counters()
+        _cache.CACHE_DIR.mkdir(parents=True)
+
+        # Act
+        with mock.patch.object(_cache, "counters", counters):
+            _cache.lookup(url)
+            _cache.store(url, {"a": 1})
+            _cache.lookup(url)
+            _cache.lookup(url)
+            counters.save()
+            _cache.lookup(url)
+            loaded = _cache.Counters().load()
+
+        # Assert
+        assert loaded == {"hits": 2, "misses": 1}
+        assert counters.load() == {"hits": 3, "misses": 1}
+
+    def test_enforce_max_bytes(self) -> None:
+        # Arrange
+        counters = _cache.Counters()
+
+        # Act
+        with (
+            mock.patch.object(_cache, "counters", counters),
+            mock.patch.object(_cache, "MAX_BYTES", 100),
+            mock.patch.object(_cache, "prune") as mock_prune,
+        ):
+            _cache.enforce_max_bytes()
+            _cache.store("https://pypistats.org/api/packages/pip/recent", {"a": 1})
+            _cache.enforce_max_bytes()
+            _cache.enforce_max_bytes()
+
+        # Assert
+        mock_prune.assert_called_once_with(max_bytes=100)
+
+    def test_cache_hit_lazy_imports(self) -> None:
+        # Arrange
+        from .test_cli import _imported_modules
+
+        url = "https://pypistats.org/api/packages/pip/overall"
+        _cache.backend.set(url, json.loads(SAMPLE_RESPONSE_OVERALL))
+        code = (
+            "from pathlib import Path\n"
+            "from pypistats import _cache\n"
+            f"_cache.CACHE_DIR = Path({str(_cache.CACHE_DIR)!r})\n"
+            "import pypistats\n"
+            "pypistats.overall('pip', format='json')\n"
+        )
+
+        # Act
+        modules = _imported_modules("-c", code)
+
+        # Assert
+        assert "pypistats._cache" in modules
+        assert not modules & {"prettytable", "termcolor", "urllib3"}
+
+    def test_save_atomic(self) -> None:
+        # Arrange
+        cache_file = _cache.CACHE_DIR / "2018-12-26-file.json"
+        _cache.save(cache_file, {"old": 1})
+
+        def fail_halfway(data, f) -> None:
+            f.write('{"new": ')
+            raise OSError
+
+        # Act
+        with mock.patch("json.dump", side_effect=fail_halfway):
+            _cache.save(cache_file, {"new": 1})
+
+        # Assert
+        assert _cache.load(cache_file) == {"old": 1}
+        assert [path.name for path in _cache.CACHE_DIR.iterdir()] == [cache_file.name]
+
+    def test_file_lock(self) -> None:
+        # Arrange
+        import threading
+
+        path = _cache.CACHE_DIR / "locks" / "test.lock"
+        holding = 0
+        max_holding = 0
+
+        def hold() -> None:
+            nonlocal holding, max_holding
+            with _cache.FileLock(path):
+                holding += 1
+                max_holding = max(max_holding, holding)
+                time.sleep(0.01)
+                holding -= 1
+
+        threads = [threading.Thread(target=hold) for _ in range(4)]
+
+        # Act
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        assert max_holding == 1
+        assert path.exists()
+
+    def test_cache_clear_keeps_lock_files(self) -> None:
+        # Arrange
+        path = _cache.CACHE_DIR / "locks" / "test.lock"
+        with _cache.FileLock(path):
+            pass
+        os.utime(path, (0, 0))
+
+        # Act
+        _cache.clear()
+
+        # Assert
+        assert path.exists()
+
+    @mock.patch("urllib3.PoolManager.request")
+    def test_locking_uses_other_process_fetch(self, mock_request) -> None:
+        # Arrange
+        url = "https://pypistats.org/api/packages/pip/overall"
+        original_lock = _cache.lock
+
+        def lock(url: str) -> _cache.FileLock:
+            # Another process fetches while this one waits for the lock
+            _cache.backend.set(url, json.loads(SAMPLE_RESPONSE_OVERALL))
+            return original_lock(url)
+
+        # Act
+        with (
+            mock.patch.object(_cache, "LOCKING", True),
+            mock.patch.object(_cache, "lock", lock),
+        ):
+            output = pypistats.overall("pip", format=None)
+
+        # Assert
+        mock_request.assert_not_called()
+        assert output[0]["downloads"] == 3587357
+        assert (_cache.CACHE_DIR / "locks" / f"{_cache.key(url)}.lock").exists()
+
+    @mock.patch("urllib3.PoolManager.request")
+    def test_no_locking(self, mock_request) -> None:
+        # Arrange
+        mock_request.return_value = mock_urllib3_response(SAMPLE_RESPONSE_OVERALL)
+
+        # Act
+        pypistats.overall("pip", format=None)
+
+        # Assert
+        mock_request.assert_called_once()
+        assert not (_cache.CACHE_DIR / "locks").exists()
+
+    @pytest.mark.parametrize(
+        "content, status",
+        [(SAMPLE_RESPONSE_OVERALL, 200), ("Not Found", 404)],
+    )
+    def test_concurrent_requests_share_one_fetch(
+        self, content: str, status: int
+    ) -> None:
+        # Arrange
+        from concurrent.futures import ThreadPoolExecutor
+
+        def slow_request(*args, **kwargs):
+            time.sleep(0.05)
+            return mock_urllib3_response(content, status=status)
+
+        def call(_) -> object:
+            try:
+                return pypistats.overall("pip", format=None)
+            except Exception as e:
+                return str(e)
+
+        # Act
+        with (
+            mock.patch("urllib3.PoolManager.request", side_effect=slow_request) as req,
+            ThreadPoolExecutor(max_workers=5) as executor,
+        ):
+            outputs = list(executor.map(call, range(5)))
+
+        # Assert
+        req.assert_called_once()
+        assert all(output == outputs[0] for output in outputs)
+
+    def test_single_flight_not_shared_after_done(self) -> None:
+        # Arrange
+        single_flight = _cache.SingleFlight()
+        func = mock.Mock(side_effect=[1, 2])
+
+        # Act
+        first = single_flight.do("key", func)
+        second = single_flight.do("key", func)
+
+        # Assert
+        assert (first, second) == (1, 2)
@@ -5,6 +5,7 @@ Unit tests for cli
 from __future__ import annotations
 
 import argparse
+from unittest import mock
 
 import pytest
 from freezegun import freeze_time
@@ -292,3 +293,125 @@ def test__python_minor_version_invalid(test_input: str) -> None:
     # Act / Assert
     with pytest.raises(argparse.ArgumentTypeError):
         cli._python_minor_version(test_input)
+
+
+@pytest.mark.parametrize(
+    "test_input, expected",
+    [
+        ("500", 500),
+        ("500k", 500 * 1024),
+        ("50M", 50 * 1024**2),
+        ("1G", 1024**3),
+        ("1gb", 1024**3),
+    ],
+)
+def test__size_valid(test_input: str, expected: int) -> None:
+    # Act / Assert
+    assert cli._size(test_input) == expected
+
+
+@pytest.mark.parametrize("test_input", ["", "-5", "1T", "big"])
+def test__size_invalid(test_input: str) -> None:
+    # Act / Assert
+    with pytest.raises(argparse.ArgumentTypeError):
+        cli._size(test_input)
+
+
+def _imported_modules(*args: str) -> set[str]:
+    """Run Python with -X importtime and return the modules it imported"""
+    import subprocess
+    import sys
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return {
+        line.split("|")[-1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+
+
+def test_version_lazy_imports() -> None:
+    # Act
+    modules = _imported_modules("-m", "pypistats", "--version")
+
+    # Assert
+    assert "pypistats.cli" in modules
+    assert not modules & {
+        "platformdirs",
+        "slugify",
+        "prettytable",
+        "termcolor",
+        "urllib3",
+        "pypistats._cache",
+    }
+
+
+@pytest.mark.parametrize(
+    "flags, expected",
+    [
+        ([], "all"),
+        (["--daily"], "daily"),
+        (["--weekly"], "weekly"),
+        (["--monthly"], "monthly"),
+        (["--quarterly"], "quarterly"),
+        (["--yearly"], "yearly"),
+    ],
+)
+def test__total(flags: list[str], expected: str) -> None:
+    # Arrange
+    args = cli.cli.parse_args(["python_minor", "pillow", *flags])
+
+    # Act
+    total = cli._total(args)
+
+    # Assert
+    assert total == expected
+
+
+def test__output_file(tmp_path) -> None:
+    # Arrange
+    args = argparse.Namespace(format="pretty", output=str(tmp_path / "out.txt"))
+
+    # Act
+    cli._output(args, "table\n")
+
+    # Assert
+    assert (tmp_path / "out.txt").read_text() == "table\n\n"
+
+
+@pytest.mark.parametrize("format_", ["arrow", "parquet"])
+def test__output_binary_file(format_: str, tmp_path) -> None:
+    # Arrange
+    pytest.importorskip("pyarrow", reason="pyarrow is not installed")
+    import pyarrow.parquet
+
+    from pypistats import _arrow
+
+    table = pyarrow.table({"downloads": [1, 2]})
+    output = table if format_ == "arrow" else _arrow.to_bytes(table, format_)
+    args = argparse.Namespace(format=format_, output=str(tmp_path / "out"))
+
+    # Act
+    cli._output(args, output)
+
+    # Assert
+    if format_ == "arrow":
+        written = pyarrow.ipc.open_file(str(tmp_path / "out")).read_all()
+    else:
+        written = pyarrow.parquet.read_table(str(tmp_path / "out"))
+    assert written.equals(table)
+
+
+def test__output_binary_terminal() -> None:
+    # Arrange
+    args = argparse.Namespace(format="parquet", output=None)
+
+    # Act / Assert
+    with mock.patch("sys.stdout.isatty", return_value=True):
+        with pytest.raises(SystemExit):
+            cli._output(args, b"PAR1")
@@ -0,0 +1,169 @@
+"""
+Unit tests for history
+"""
+
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from freezegun import freeze_time
+
+import pypistats
+from pypistats import _cache, _history
+
+from .test_pypistats import mock_urllib3_response
+
+URL = "https://pypistats.org/api/packages/pip/overall"
+
+
+def response(*rows: tuple[str | int, str, int]) -> dict:
+    return {
+        "data": [
+            {"category": category, "date": date, "downloads": downloads}
+            for category, date, downloads in rows
+        ],
+        "package": "pip",
+        "type": "overall_downloads",
+    }
+
+
+class TestHistory:
+    def setup_method(self) -> None:
+        # Choose a new cache dir that doesn't exist
+        self.original_cache_dir = _cache.CACHE_DIR
+        self.temp_dir = tempfile.TemporaryDirectory()
+        _cache.CACHE_DIR = Path(self.temp_dir.name) / "pypistats"
+        pypistats.cache_clear()
+
+    def teardown_method(self) -> None:
+        # Reset original
+        _cache.CACHE_DIR = self.original_cache_dir
+
+    def test_merge(self) -> None:
+        # Arrange
+        _history.merge(
+            URL,
+            response(
+                ("with_mirrors", "2020-05-01", 10), ("with_mirrors", "2020-05-02", 20)
+            ),
+        )
+
+        # Act
+        res = _history.merge(
+            URL,
+            response(
+                ("with_mirrors", "2020-05-02", 25), ("with_mirrors", "2020-05-03", 30)
+            ),
+        )
+
+        # Assert
+        assert res == response(
+            ("with_mirrors", "2020-05-01", 10),
+            ("with_mirrors", "2020-05-02", 25),
+            ("with_mirrors", "2020-05-03", 30),
+        )
+        assert _cache.load(_history.filename(URL)) == res
+
+    def test_merge_history_with_other_compression(self) -> None:
+        # Arrange
+        json_file = _history.filename(URL)
+        _cache.save(json_file, response(("with_mirrors", "2020-05-01", 10)))
+        pypistats.configure_cache(compression="gzip")
+
+        # Act
+        try:
+            res = _history.merge(URL, response(("with_mirrors", "2020-05-02", 20)))
+            gzip_file = _history.filename(URL)
+        finally:
+            pypistats.configure_cache(compression=None)
+
+        # Assert
+        assert res == response(
+            ("with_mirrors", "2020-05-01", 10), ("with_mirrors", "2020-05-02", 20)
+        )
+        assert gzip_file.name.endswith(".json.gz")
+        assert _cache.load(gzip_file) == res
+        assert not json_file.exists()
+
+    def test_merge_sorted_like_api(self) -> None:
+        # Act
+        res = _history.merge(
+            URL,
+            response(
+                ("without_mirrors", "2020-05-01", 1),
+                ("with_mirrors", "2020-05-02", 2),
+                ("with_mirrors", "2020-05-01", 3),
+            ),
+        )
+
+        # Assert
+        assert [(row["category"], row["date"]) for row in res["data"]] == [
+            ("with_mirrors", "2020-05-01"),
+            ("with_mirrors", "2020-05-02"),
+            ("without_mirrors", "2020-05-01"),
+        ]
+
+    def test_merge_mixed_categories(self) -> None:
+        # Arrange
+        _history.merge(URL, response(("null", "2020-05-01", 1)))
+        res = response((3, "2020-05-01", 2), (2, "2020-05-01", 3))
+
+        # Act
+        output = _history.merge(URL, res)
+
+        # Assert
+        assert [row["category"] for row in output["data"]] == [2, 3, "null"]
+
+    def test_merge_unchanged_not_saved(self) -> None:
+        # Arrange
+        res = response(("with_mirrors", "2020-05-01", 10))
+        _history.merge(URL, res)
+
+        # Act
+        with mock.patch.object(_cache, "save") as mock_save:
+            _history.merge(URL, res)
+
+        # Assert
+        mock_save.assert_not_called()
+
+    def test_merge_recent(self) -> None:
+        # Arrange
+        res = {"data": {"last_day": 1}, "package": "pip", "type": "recent_downloads"}
+
+        # Act
+        output = _history.merge(URL, res)
+
+        # Assert
+        assert output == res
+        assert not _history.filename(URL).exists()
+
+    @mock.patch("urllib3.PoolManager.request")
+    def test_history_older_than_api(self, mock_request) -> None:
+        # Arrange
+        mock_request.return_value = mock_urllib3_response(
+            '{"data": [{"category": "with_mirrors", "date": "2020-05-01", '
+            '"downloads": 10}], "package": "pip", "type": "overall_downloads"}'
+        )
+        with freeze_time("2020-05-02"):
+            pypistats.overall("pip", history=True)
+        pypistats.cache_clear()
+        mock_request.return_value = mock_urllib3_response(
+            '{"data": [{"category": "with_mirrors", "date": "2020-05-02", '
+            '"downloads": 20}], "package": "pip", "type": "overall_downloads"}'
+        )
+
+        # Act
+        with freeze_time("2020-05-03"):
+            _cache.clear()
+            output = pypistats.overall(
+                "pip", history=True, total="daily", sort="date", format=None
+            )
+
+        # Assert
+        assert [(row.get("date"), row["downloads"]) for row in output] == [
+            ("2020-05-01", 10),
+            ("2020-05-02", 20),
+            (None, 30),
+        ]
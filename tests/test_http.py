@@ -0,0 +1,302 @@
+"""
+Unit tests for the HTTP client
+"""
+
+from __future__ import annotations
+
+import http.server
+import threading
+from unittest import mock
+
+import pytest
+import urllib3
+from freezegun import freeze_time
+
+import pypistats
+from pypistats import _http
+
+from .test_pypistats import mock_urllib3_response
+
+
+class TestClient:
+    def test_pool_configured(self) -> None:
+        # Arrange
+        client = pypistats.Client(maxsize=4, timeout=5.0, retries=2, block=True)
+
+        # Act
+        pool = client.pool
+
+        # Assert
+        assert isinstance(pool, urllib3.PoolManager)
+        assert pool.connection_pool_kw["maxsize"] == 4
+        assert pool.connection_pool_kw["block"] is True
+        assert pool.connection_pool_kw["timeout"] == 5.0
+        assert pool.connection_pool_kw["retries"].total == 2
+
+    def test_pool_reused(self) -> None:
+        # Arrange
+        client = pypistats.Client()
+
+        # Act / Assert
+        assert client.pool is client.pool
+
+    def test_custom_retry(self) -> None:
+        # Arrange
+        retry = urllib3.Retry(total=7)
+
+        # Act
+        client = pypistats.Client(retries=retry)
+
+        # Assert
+        assert client.pool.connection_pool_kw["retries"] is retry
+
+    @mock.patch("urllib3.PoolManager.request")
+    def test_get(self, mock_request) -> None:
+        # Arrange
+        client = pypistats.Client()
+        url = "https://pypistats.org/api/packages/pip/recent"
+
+        # Act
+        client.get(url)
+
+        # Assert
+        mock_request.assert_called_once_with(
+            "GET", url, headers={"User-Agent": pypistats.USER_AGENT}
+        )
+
+    @mock.patch("urllib3.PoolManager.clear")
+    def test_context_manager_closes(self, mock_clear) -> None:
+        # Arrange
+        with pypistats.Client() as client:
+            assert client.pool is not None
+
+        # Assert
+        mock_clear.assert_called_once()
+
+    def test_default_client_shared(self) -> None:
+        # Act / Assert
+        assert _http.default_client() is _http.default_client()
+
+    def test_configure_client(self) -> None:
+        # Arrange
+        original = _http._default_client
+
+        # Act
+        try:
+            pypistats.configure_client(rate=2, retries=5)
+            client = _http.default_client()
+        finally:
+            _http._default_client = original
+
+        # Assert
+        assert client.retries == 5
+        assert client.limiter is not None
+        assert client.limiter.rate == 2
+
+    @mock.patch("time.sleep")
+    @mock.patch("urllib3.PoolManager.request")
+    def test_get_retries_status(self, mock_request, mock_sleep) -> None:
+        # Arrange
+        mock_request.side_effect = [
+            mock_urllib3_response("", status=503, headers={"Retry-After": "7"}),
+            mock_urllib3_response("", status=429),
+            mock_urllib3_response("{}"),
+        ]
+        client = pypistats.Client()
+
+        # Act
+        r = client.get("https://pypistats.org/api/packages/pip/recent")
+
+        # Assert
+        assert r.status == 200
+        assert mock_request.call_count == 3
+        assert mock_sleep.call_args_list[0] == mock.call(7.0)
+        assert 0.5 <= mock_sleep.call_args_list[1].args[0] <= 1
+
+    @mock.patch("time.sleep")
+    @mock.patch("urllib3.PoolManager.request")
+    def test_get_gives_up(self, mock_request, mock_sleep) -> None:
+        # Arrange
+        mock_request.return_value = mock_urllib3_response("", status=500)
+        client = pypistats.Client(retries=2)
+
+        # Act
+        r = client.get("https://pypistats.org/api/packages/pip/recent")
+
+        # Assert
+        assert r.status == 500
+        assert mock_request.call_count == 3
+
+    @mock.patch("urllib3.PoolManager.request")
+    def test_get_not_retried(self, mock_request) -> None:
+        # Arrange
+        mock_request.return_value = mock_urllib3_response("", status=404)
+        client = pypistats.Client()
+
+        # Act
+        r = client.get("https://pypistats.org/api/packages/pip/recent")
+
+        # Assert
+        assert r.status == 404
+        mock_request.assert_called_once()
+
+    @mock.patch("time.sleep")
+    @mock.patch("urllib3.PoolManager.request")
+    def test_get_rate_limited(self, mock_request, mock_sleep) -> None:
+        # Arrange
+        mock_request.side_effect = [
+            mock_urllib3_response("", status=429, headers={"Retry-After": "3"}),
+            mock_urllib3_response("{}"),
+        ]
+        limiter = mock.Mock(spec=_http.RateLimiter)
+        client = pypistats.Client(limiter=limiter)
+
+        # Act
+        client.get("https://pypistats.org/api/packages/pip/recent")
+
+        # Assert
+        assert limiter.wait.call_count == 2
+        limiter.pause.assert_called_once_with(3.0)
+
+    @mock.patch("time.sleep")
+    def test_get_rate_limited_real_pool(self, mock_sleep) -> None:
+        # Arrange
+        requests = 0
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                nonlocal requests
+                requests += 1
+                self.send_response(429)
+                self.send_header("Retry-After", "1")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args: object) -> None:
+                pass
+
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        limiter = mock.Mock(spec=_http.RateLimiter)
+        client = pypistats.Client(retries=1, limiter=limiter)
+
+        # Act
+        try:
+            with mock.patch.object(_http, "RETRY_AFTER_MAX", 0):
+                r = client.get(f"http://127.0.0.1:{server.server_port}/")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        # Assert
+        # Retried once by get(), not also by urllib3 without the limiter
+        assert r.status == 429
+        assert requests == 2
+        limiter.pause.assert_called_once_with(0)
+        mock_sleep.assert_called_once_with(0)
+
+
+class TestRateLimiter:
+    @mock.patch("time.monotonic")
+    def test_reserve(self, mock_monotonic) -> None:
+        # Arrange
+        mock_monotonic.return_value = 100.0
+        limiter = pypistats.RateLimiter(rate=2)
+
+        # Act
+        delays = [limiter.reserve() for _ in range(3)]
+        mock_monotonic.return_value = 101.0
+        delays.append(limiter.reserve())
+
+        # Assert
+        assert delays == [0, 0.5, 1.0, 0.5]
+
+    @mock.patch("time.monotonic")
+    def test_reserve_burst(self, mock_monotonic) -> None:
+        # Arrange
+        mock_monotonic.return_value = 100.0
+        limiter = pypistats.RateLimiter(rate=1, burst=3)
+        mock_monotonic.return_value = 200.0
+
+        # Act
+        delays = [limiter.reserve() for _ in range(4)]
+
+        # Assert
+        assert delays == [0, 0, 0, 1.0]
+
+    @mock.patch("time.monotonic")
+    def test_pause(self, mock_monotonic) -> None:
+        # Arrange
+        mock_monotonic.return_value = 100.0
+        limiter = pypistats.RateLimiter(rate=10, burst=5)
+
+        # Act
+        limiter.pause(30)
+        mock_monotonic.return_value = 110.0
+        delay = limiter.reserve()
+
+        # Assert
+        assert delay == 20
+
+    @mock.patch("time.monotonic")
+    def test_pause_paces_waiters(self, mock_monotonic) -> None:
+        # Arrange
+        mock_monotonic.return_value = 100.0
+        limiter = pypistats.RateLimiter(rate=1, burst=3)
+
+        # Act
+        limiter.pause(10)
+        delays = [limiter.reserve() for _ in range(6)]
+
+        # Assert
+        assert delays == [10, 11, 12, 13, 14, 15]
+
+    @mock.patch("time.monotonic")
+    def test_shorter_pause_ignored(self, mock_monotonic) -> None:
+        # Arrange
+        mock_monotonic.return_value = 100.0
+        limiter = pypistats.RateLimiter(rate=1)
+        limiter.pause(10)
+        first = limiter.reserve()
+
+        # Act
+        limiter.pause(5)
+        second = limiter.reserve()
+
+        # Assert
+        assert (first, second) == (10, 11)
+
+    def test_invalid_rate(self) -> None:
+        # Act / Assert
+        with pytest.raises(ValueError, match="rate must be positive"):
+            pypistats.RateLimiter(rate=0)
+
+
+@pytest.mark.parametrize(
+    "retry_after, expected",
+    [
+        ("120", 120.0),
+        ("-5", 0.0),
+        ("86400", _http.RETRY_AFTER_MAX),
+        ("Thu, 27 Dec 2018 00:00:00 GMT", _http.RETRY_AFTER_MAX),
+        ("Wed, 26 Dec 2018 00:01:00 GMT", 60.0),
+        ("Wed, 26 Dec 2018 00:00:00 GMT", 0.0),
+    ],
+)
+@freeze_time("2018-12-26 00:00:00")
+def test_retry_delay_retry_after(retry_after: str, expected: float) -> None:
+    # Act / Assert
+    assert _http.retry_delay(0, retry_after) == expected
+
+
+@pytest.mark.parametrize(
+    "attempt, low, high",
+    [(0, 0.25, 0.5), (3, 2, 4), (10, 30, 60)],
+)
+def test_retry_delay_backoff(attempt: int, low: float, high: float) -> None:
+    # Act
+    delays = [_http.retry_delay(attempt, "invalid") for _ in range(20)]
+
+    # Assert
+    assert all(low <= delay <= high for delay in delays)
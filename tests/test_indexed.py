@@ -0,0 +1,171 @@
+"""
+Unit tests for rows indexed by category and date
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+from unittest import mock
+
+import pytest
+
+import pypistats
+from pypistats import _indexed
+
+from .data.python_minor import DATA as PYTHON_MINOR_DATA
+
+START_END_DATES = [
+    (None, None),
+    ("2018-09-01", None),
+    (None, "2018-09-30"),
+    ("2018-09-01", "2018-09-30"),
+    ("2018-09", "2018-09-15"),
+    ("2018-09-15", "2018-09-01"),
+    ("2030-01-01", None),
+]
+
+
+class TestRows:
+    @pytest.mark.parametrize("start_date, end_date", START_END_DATES)
+    def test_filter_same_as_python(
+        self, start_date: str | None, end_date: str | None
+    ) -> None:
+        # Arrange
+        rows = _indexed.Rows.from_rows(PYTHON_MINOR_DATA)
+        assert rows is not None
+
+        # Act
+        filtered = rows.filter(start_date, end_date)
+
+        # Assert
+        expected = pypistats._filter(PYTHON_MINOR_DATA, start_date, end_date)
+        assert filtered.rows() == expected
+        assert (filtered.first, filtered.last) == (
+            pypistats._date_range(expected) if expected else (None, None)
+        )
+
+    def test_first_last(self) -> None:
+        # Act
+        rows = _indexed.Rows.from_rows(PYTHON_MINOR_DATA)
+
+        # Assert
+        assert rows is not None
+        assert (rows.first, rows.last) == pypistats._date_range(PYTHON_MINOR_DATA)
+
+    def test_offsets(self) -> None:
+        # Arrange
+        data = [
+            {"category": "3.9", "date": "2020-01-01", "downloads": 1},
+            {"category": "3.9", "date": "2020-01-02", "downloads": 2},
+            {"category": "2.7", "date": "2019-12-31", "downloads": 3},
+            {"category": "null", "date": "2020-01-01", "downloads": 4},
+            {"category": "null", "date": "2020-01-03", "downloads": 5},
+        ]
+
+        # Act
+        rows = _indexed.Rows.from_rows(data)
+
+        # Assert
+        assert rows is not None
+        assert rows.offsets == {"3.9": (0, 2), "2.7": (2, 3), "null": (3, 5)}
+        assert (rows.first, rows.last) == ("2019-12-31", "2020-01-03")
+        filtered = rows.filter("2020-01-02")
+        assert filtered.offsets == {"3.9": (0, 1), "null": (1, 2)}
+        assert filtered.rows() == [data[1], data[4]]
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            # Not sorted by date
+            [
+                {"category": "3.9", "date": "2020-01-02", "downloads": 1},
+                {"category": "3.9", "date": "2020-01-01", "downloads": 2},
+            ],
+            # Not grouped by category
+            [
+                {"category": "3.9", "date": "2020-01-01", "downloads": 1},
+                {"category": "2.7", "date": "2020-01-01", "downloads": 2},
+                {"category": "3.9", "date": "2020-01-02", "downloads": 3},
+            ],
+            # Not a time series
+            [{"category": "3.9", "downloads": 1}],
+            [
+                {"category": "3.9", "date": None, "downloads": 1},
+                {"category": "3.9", "date": "2020-01-01", "downloads": 1},
+            ],
+        ],
+    )
+    def test_not_indexed(self, data: list[dict]) -> None:
+        # Act
+        rows = _indexed.Rows.from_rows(data)
+
+        # Assert
+        assert rows is None
+
+    @pytest.mark.parametrize("total", ["all", "monthly", "daily"])
+    @pytest.mark.parametrize("start_date, end_date", START_END_DATES)
+    def test_process_unsorted_same_as_sorted(
+        self,
+        total: str,
+        start_date: str | None,
+        end_date: str | None,
+        recwarn: pytest.WarningsRecorder,
+    ) -> None:
+        # Arrange
+        res = {"data": copy.deepcopy(PYTHON_MINOR_DATA), "package": "pip"}
+        unsorted = {**res, "data": res["data"][::-1]}
+
+        # Act
+        output = pypistats._process(res, "json", start_date, end_date, total=total)
+        expected = pypistats._process(
+            unsorted, "json", start_date, end_date, total=total
+        )
+
+        # Assert
+        def key(row: dict) -> tuple:
+            return row["category"], row.get("date", "")
+
+        assert sorted(json.loads(output)["data"], key=key) == sorted(
+            json.loads(expected)["data"], key=key
+        )
+
+
+class TestPackageStats:
+    def test_indexed_once(self) -> None:
+        # Arrange
+        res = {"data": copy.deepcopy(PYTHON_MINOR_DATA), "package": "pip"}
+
+        # Act
+        with mock.patch.object(
+            _indexed.Rows, "from_rows", wraps=_indexed.Rows.from_rows
+        ) as mock_from_rows:
+            stats = pypistats.PackageStats(res)
+            for total in ("daily", "monthly", "all"):
+                stats.view(total=total)
+                stats.view(total=total, start_date="2018-09-01")
+
+        # Assert
+        mock_from_rows.assert_called_once_with(res["data"])
+        assert res["data"] == PYTHON_MINOR_DATA
+
+    @pytest.mark.parametrize("total", ["all", "monthly", "daily"])
+    @pytest.mark.parametrize("start_date, end_date", START_END_DATES)
+    def test_view_same_as_process(
+        self,
+        total: str,
+        start_date: str | None,
+        end_date: str | None,
+        recwarn: pytest.WarningsRecorder,
+    ) -> None:
+        # Arrange
+        res = {"data": copy.deepcopy(PYTHON_MINOR_DATA), "package": "pip"}
+        stats = pypistats.PackageStats(res)
+
+        # Act
+        output = stats.view("json", start_date, end_date, total=total)
+
+        # Assert
+        assert output == pypistats._process(
+            copy.deepcopy(res), "json", start_date, end_date, total=total
+        )
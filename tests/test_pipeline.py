@@ -0,0 +1,284 @@
+"""
+Unit tests for the pipeline of stages
+"""
+
+from __future__ import annotations
+
+import copy
+import inspect
+import json
+from typing import Any
+from unittest import mock
+
+import pytest
+
+import pypistats
+from pypistats import _pipeline
+
+from .data.python_minor import DATA as PYTHON_MINOR_DATA
+from .test_stream import RESPONSE, mock_streamed_response
+
+ROWS = [
+    {"category": "a", "date": "2018-08-31", "downloads": 1},
+    {"category": "b", "date": "2018-09-01", "downloads": 2},
+    {"category": "a", "date": "2018-09-02", "downloads": 3},
+    {"category": "b", "date": "2018-10-01", "downloads": 4},
+]
+
+
+def only(category: str) -> _pipeline.Stage:
+    """A custom stage keeping one category"""
+
+    def stage(rows):
+        return (row for row in rows if row["category"] == category)
+
+    return stage
+
+
+@pytest.mark.parametrize(
+    "start_date, end_date, total, expected",
+    [
+        (None, None, "daily", ROWS),
+        ("2018-09-01", None, "daily", ROWS[1:]),
+        (None, "2018-09-02", "daily", ROWS[:3]),
+        ("2018-09-01", "2018-09-02", "daily", ROWS[1:3]),
+        (
+            None,
+            None,
+            "all",
+            [{"category": "a", "downloads": 4}, {"category": "b", "downloads": 6}],
+        ),
+        (
+            "2018-09-01",
+            None,
+            "monthly",
+            [
+                {"category": "b", "date": "2018-09", "downloads": 2},
+                {"category": "b", "date": "2018-10", "downloads": 4},
+                {"category": "a", "date": "2018-09", "downloads": 3},
+            ],
+        ),
+    ],
+)
+def test_stages(
+    start_date: str | None, end_date: str | None, total: str, expected: list[dict]
+) -> None:
+    # Arrange
+    stages = [_pipeline.filter_dates(start_date, end_date)]
+    if total == "monthly":
+        stages.append(_pipeline.total_monthly)
+    elif total == "all":
+        stages.append(_pipeline.total_all)
+
+    # Act
+    output = list(_pipeline.run(iter(ROWS), stages))
+
+    # Assert
+    assert output == expected
+
+
+@pytest.mark.parametrize("total", ["all", "weekly", "monthly", "quarterly", "yearly"])
+@pytest.mark.parametrize(
+    "start_date, end_date",
+    [(None, None), ("2018-09-01", None), (None, "2018-09-30"), ("2018-09-15", None)],
+)
+def test_totals_same_as_stages(
+    total: str, start_date: str | None, end_date: str | None
+) -> None:
+    # Arrange
+    totals = _pipeline.Totals(start_date, end_date, total)
+    stages = [
+        _pipeline.filter_dates(start_date, end_date),
+        _pipeline.total_periods(total),
+    ]
+
+    # Act
+    output = list(totals(iter(PYTHON_MINOR_DATA)))
+
+    # Assert
+    expected = list(_pipeline.run(PYTHON_MINOR_DATA, stages))
+    assert output == expected
+    assert totals.grand_total == pypistats._grand_total_value(expected)
+    assert (totals.first, totals.last) == pypistats._date_range(PYTHON_MINOR_DATA)
+
+
+@pytest.mark.parametrize("total", ["weekly", "monthly", "quarterly", "yearly"])
+def test_total_periods(total: str) -> None:
+    # Arrange
+    period_of = _pipeline.PERIODS[total]
+    rows: list[dict[str, Any]] = PYTHON_MINOR_DATA
+    expected: dict = {}
+    for row in rows:
+        key = (row["category"], period_of(row["date"]))
+        expected[key] = expected.get(key, 0) + row["downloads"]
+
+    # Act
+    output = list(_pipeline.total_periods(total)(rows))
+
+    # Assert
+    assert {(row["category"], row["date"]): row["downloads"] for row in output} == (
+        expected
+    )
+    assert len(output) == len(expected)
+
+
+@pytest.mark.parametrize(
+    "date, week, month, quarter, year",
+    [
+        ("2018-09-03", "2018-W36", "2018-09", "2018-Q3", "2018"),
+        ("2018-12-31", "2019-W01", "2018-12", "2018-Q4", "2018"),
+        ("2021-01-03", "2020-W53", "2021-01", "2021-Q1", "2021"),
+        ("2021-06-30", "2021-W26", "2021-06", "2021-Q2", "2021"),
+    ],
+)
+def test_periods(date: str, week: str, month: str, quarter: str, year: str) -> None:
+    # Act
+    periods = {total: period_of(date) for total, period_of in _pipeline.PERIODS.items()}
+
+    # Assert
+    assert periods == {
+        "weekly": week,
+        "monthly": month,
+        "quarterly": quarter,
+        "yearly": year,
+    }
+
+
+@pytest.mark.parametrize(
+    "period, expected",
+    [
+        ("2018-W36", "2018-09-03"),
+        ("2020-W53", "2020-12-28"),
+        ("2018-09", "2018-09-01"),
+        ("2018-Q1", "2018-01-01"),
+        ("2018-Q4", "2018-10-01"),
+        ("2018", "2018-01-01"),
+        ("2018-09-03", "2018-09-03"),
+    ],
+)
+def test_period_start(period: str, expected: str) -> None:
+    # Act / Assert
+    assert _pipeline.period_start(period) == expected
+
+
+@pytest.mark.parametrize(
+    "rows, expected",
+    [
+        # For "overall", without_mirrors is a subset of with_mirrors
+        (
+            [
+                {"category": "with_mirrors", "date": "2018-09-01", "downloads": 5},
+                {"category": "without_mirrors", "date": "2018-09-01", "downloads": 4},
+                {"category": "with_mirrors", "date": "2018-09-02", "downloads": 3},
+            ],
+            8,
+        ),
+        (ROWS, 10),
+        ([], 0),
+    ],
+)
+def test_totals_grand_total(rows: list[dict], expected: int) -> None:
+    # Arrange
+    totals = _pipeline.Totals()
+
+    # Act
+    list(totals(rows))
+
+    # Assert
+    assert totals.grand_total == expected
+
+
+def test_totals_no_dates() -> None:
+    # Arrange
+    rows = [{"category": "a", "downloads": 1}, *ROWS]
+    totals = _pipeline.Totals()
+
+    # Act
+    output = list(totals(rows))
+
+    # Assert
+    assert output == [
+        {"category": "a", "downloads": 5},
+        {"category": "b", "downloads": 6},
+    ]
+    assert (totals.first, totals.last) == (None, None)
+
+
+def test_filter_dates_is_lazy() -> None:
+    # Arrange
+    rows = mock.MagicMock()
+    rows.__iter__.return_value = iter(ROWS)
+    stage = _pipeline.filter_dates("2018-09-01")
+
+    # Act
+    output = stage(rows)
+
+    # Assert
+    assert inspect.isgenerator(output)
+    rows.__iter__.assert_not_called()
+    assert next(output) == ROWS[1]
+
+
+def test_filter_dates_no_dates() -> None:
+    # Act
+    output = _pipeline.filter_dates()(ROWS)
+
+    # Assert
+    assert list(output) == ROWS
+
+
+@pytest.mark.parametrize(
+    "rows, first, last",
+    [
+        (ROWS, "2018-08-31", "2018-10-01"),
+        (ROWS[::-1], "2018-08-31", "2018-10-01"),
+        ([], None, None),
+        ([{"category": "a", "downloads": 1}, *ROWS], None, None),
+    ],
+)
+def test_date_range(rows: list[dict], first: str | None, last: str | None) -> None:
+    # Arrange
+    dates = _pipeline.DateRange()
+
+    # Act
+    output = list(dates(rows))
+
+    # Assert
+    assert output == rows
+    assert dates.first == first
+    assert dates.last == last
+
+
+@pytest.mark.parametrize("total", ["all", "monthly", "daily"])
+def test_custom_stage(total: str) -> None:
+    # Arrange
+    res = {"data": copy.deepcopy(PYTHON_MINOR_DATA), "package": "pip", "type": "x"}
+    expected = pypistats._process(copy.deepcopy(res), format="json", total=total)
+    expected_rows = [
+        row for row in json.loads(expected)["data"] if row["category"] == "3.7"
+    ]
+
+    # Act
+    output = pypistats._process(res, format="json", total=total, stages=[only("3.7")])
+
+    # Assert
+    assert json.loads(output)["data"] == expected_rows
+
+
+@mock.patch("urllib3.PoolManager.request")
+def test_custom_stage_streamed(mock_request: mock.Mock) -> None:
+    # Arrange
+    mock_request.return_value = mock_streamed_response(json.dumps(RESPONSE))
+    expected = pypistats._process(
+        copy.deepcopy(RESPONSE), format="json", stages=[only("3.7")]
+    )
+
+    # Act
+    with mock.patch.object(pypistats, "_load_cache", return_value=None):
+        output = pypistats.python_minor(
+            "pip", format="json", stream=True, stages=[only("3.7")]
+        )
+
+    # Assert
+    assert output == expected
+    assert [row["category"] for row in json.loads(output)["data"]] == ["3.7"]
@@ -5,6 +5,7 @@ Unit tests for pypistats
 from __future__ import annotations
 
 import copy
+import datetime as dt
 import json
 from pathlib import Path
 from unittest import mock
@@ -58,7 +59,7 @@ SAMPLE_RESPONSE_OVERALL = """{
         }"""
 
 
-def stub__cache_filename(*args) -> Path:
+def stub__cache_filename(*args, **kwargs) -> Path:
     return Path("/this/does/not/exist")
 
 
@@ -66,31 +67,38 @@ def stub__save_cache(*args) -> None:
     pass
 
 
-def mock_urllib3_response(content: str, status: int = 200) -> mock.Mock:
+def mock_urllib3_response(
+    content: str, status: int = 200, headers: dict[str, str] | None = None
+) -> mock.Mock:
     """Helper to create a mock urllib3 response."""
     response = mock.Mock()
     response.status = status
     response.data = content.encode()
+    response.headers = headers or {}
     return response
 
 
 def assert_called_with_url(mock_request: mock.Mock, url: str) -> None:
-    """Assert that urllib3.request was called once with the given URL."""
+    """Assert that the pool manager was called once with the given URL."""
     mock_request.assert_called_once_with("GET", url, headers=mock.ANY)
 
 
 class TestPypiStats:
     def setup_method(self) -> None:
         # Stub caching. Caches are tested in another class.
+        pypistats.cache_clear()
         self.original__cache_filename = _cache.filename
         self.original__save_cache = _cache.save
+        self.original__validators_filename = _cache.validators_filename
         _cache.filename = stub__cache_filename  # type: ignore[assignment]
         _cache.save = stub__save_cache  # type: ignore[assignment]
+        _cache.validators_filename = stub__cache_filename  # type: ignore[assignment]
 
     def teardown_method(self) -> None:
         # Unstub caching
         _cache.filename = self.original__cache_filename
         _cache.save = self.original__save_cache
+        _cache.validators_filename = self.original__validators_filename
         termcolor.can_colorize.cache_clear()
 
     def test__filter_no_filters_no_change(self) -> None:
@@ -144,7 +152,7 @@ class TestPypiStats:
             assert row["date"] >= start_date
             assert row["date"] <= end_date
 
-    @mock.patch("urllib3.request")
+    @mock.patch("urllib3.PoolManager.request")
     def test_warn_if_start_date_before_earliest_available(self, mock_request) -> None:
         # Arrange
         start_date = "2000-01-01"
@@ -172,7 +180,7 @@ class TestPypiStats:
             mock_request, "https://pypistats.org/api/packages/pip/python_major"
         )
 
-    @mock.patch("urllib3.request")
+    @mock.patch("urllib3.PoolManager.request")
     def test_error_if_end_date_before_earliest_available(self, mock_request) -> None:
         # Arrange
         end_date = "2000-01-01"
@@ -411,12 +419,12 @@ class TestPypiStats:
 
     def test__validate_total(self) -> None:
         """Test the _validate_total method with valid and invalid inputs."""
-        valid_values = ("daily", "monthly", "all")
+        valid_values = ("daily", "weekly", "monthly", "quarterly", "yearly", "all")
         for value in valid_values:
             pypistats._validate_total(value)
 
         with pytest.raises(ValueError, match="total must be one of"):
-            pypistats._validate_total("weekly")
+            pypistats._validate_total("hourly")
 
     def test__total_recent(self) -> None:
         # Arrange
@@ -547,7 +555,7 @@ class TestPypiStats:
         # Assert
         assert output == SAMPLE_DATA_RECENT
 
-    @mock.patch("urllib3.request")
+    @mock.patch("urllib3.PoolManager.request")
     def test_valid_json(self, mock_request) -> None:
         # Arrange
         package = "pip"
@@ -567,7 +575,7 @@ class TestPypiStats:
             mock_request, "https://pypistats.org/api/packages/pip/recent?&period=day"
         )
 
-    @mock.patch("urllib3.request")
+    @mock.patch("urllib3.PoolManager.request")
     @pytest.mark.parametrize(
         "test_format, expected_output",
         [
@@ -609,7 +617,7 @@ last_day\tlast_month\tlast_week
             mock_request, "https://pypistats.org/api/packages/pip/recent"
         )
 
-    @mock.patch("urllib3.request")
+    @mock.patch("urllib3.PoolManager.request")
     def test_overall_tabular_start_date(self, mock_request, monkeypatch) -> None:
         # Arrange
         package = "pip"
@@ -638,7 +646,7 @@ Date range: 2020-05-02 - 2020-05-02
             "https://pypistats.org/api/packages/pip/overall?&mirrors=false",
         )
 
-    @mock.patch("urllib3.request")
+    @mock.patch("urllib3.PoolManager.request")
     def test_overall_tabular_end_date(self, mock_request, monkeypatch) -> None:
         # Arrange
         package = "pip"
@@ -667,7 +675,7 @@ Date range: 2020-05-01 - 2020-05-01
             "https://pypistats.org/api/packages/pip/overall?&mirrors=false",
         )
 
-    @mock.patch("urllib3.request")
+    @mock.patch("urllib3.PoolManager.request")
     def test_python_major_json(self, mock_request) -> None:
         # Arrange
         package = "pip"
@@ -700,7 +708,7 @@ Date range: 2020-05-01 - 2020-05-01
             mock_request, "https://pypistats.org/api/packages/pip/python_major"
         )
 
-    @mock.patch("urllib3.request")
+    @mock.patch("urllib3.PoolManager.request")
     def test_python_minor_json(self, mock_request) -> None:
         # Arrange
         package = "pip"
@@ -747,7 +755,7 @@ Date range: 2020-05-01 - 2020-05-01
             mock_request, "https://pypistats.org/api/packages/pip/python_minor"
         )
 
-    @mock.patch("urllib3.request")
+    @mock.patch("urllib3.PoolManager.request")
     def test_system_tabular(self, mock_request, monkeypatch) -> None:
         # Arrange
         package = "pip"
@@ -784,7 +792,7 @@ Date range: 2020-05-01 - 2020-05-01
             mock_request, "https://pypistats.org/api/packages/pip/system"
         )
 
-    @mock.patch("urllib3.request")
+    @mock.patch("urllib3.PoolManager.request")
     def test_python_minor_monthly(self, mock_request) -> None:
         # Arrange
         package = "pip"
@@ -839,7 +847,7 @@ Date range: 2020-05-01 - 2020-05-01
         # Assert
         assert output.strip() == expected_output.strip()
 
-    @mock.patch("urllib3.request")
+    @mock.patch("urllib3.PoolManager.request")
     def test_format_numpy(self, mock_request) -> None:
         # Arrange
         numpy = pytest.importorskip("numpy", reason="NumPy is not installed")
@@ -860,7 +868,7 @@ Date range: 2020-05-01 - 2020-05-01
             mock_request, "https://pypistats.org/api/packages/pip/overall"
         )
 
-    @mock.patch("urllib3.request")
+    @mock.patch("urllib3.PoolManager.request")
     def test_format_pandas(self, mock_request) -> None:
         # Arrange
         pandas = pytest.importorskip("pandas", reason="pandas is not installed")
@@ -882,7 +890,251 @@ Date range: 2020-05-01 - 2020-05-01
             mock_request, "https://pypistats.org/api/packages/pip/overall"
         )
 
-    @mock.patch("urllib3.request")
+    @mock.patch("urllib3.PoolManager.request")
+    def test_format_numpy_typed(self, mock_request) -> None:
+        # Arrange
+        numpy = pytest.importorskip("numpy", reason="NumPy is not installed")
+        package = "pip"
+        mocked_response = SAMPLE_RESPONSE_OVERALL
+
+        # Act
+        mock_request.return_value = mock_urllib3_response(mocked_response)
+        output = pypistats.overall(package, total="daily", format="numpy-typed")
+
+        # Assert
+        assert output.dtype.names == ("category", "date", "percent", "downloads")
+        assert output.dtype["date"] == numpy.dtype("datetime64[D]")
+        assert output.dtype["downloads"] == numpy.int64
+        # Sorted by downloads, with no total row
+        assert list(output["category"]) == [
+            "with_mirrors",
+            "without_mirrors",
+            "with_mirrors",
+            "without_mirrors",
+        ]
+        assert output["date"][0] == numpy.datetime64("2020-05-01")
+        assert output["percent"][0] == pytest.approx(2100139 / 3587357 * 100)
+        assert list(output["downloads"]) == [2100139, 2083472, 1487218, 1475979]
+
+    @pytest.mark.parametrize(
+        "total, period",
+        [("weekly", "2020-W18"), ("quarterly", "2020-Q2"), ("yearly", "2020")],
+    )
+    @mock.patch("urllib3.PoolManager.request")
+    def test_periods(self, mock_request, total: str, period: str) -> None:
+        # Arrange
+        package = "pip"
+        mocked_response = SAMPLE_RESPONSE_OVERALL
+
+        # Act
+        mock_request.return_value = mock_urllib3_response(mocked_response)
+        output = pypistats.overall(package, total=total, format="json")
+
+        # Assert
+        assert json.loads(output)["data"] == [
+            {"category": "with_mirrors", "date": period, "downloads": 3587357},
+            {"category": "without_mirrors", "date": period, "downloads": 3559451},
+        ]
+
+    @pytest.mark.parametrize(
+        "total, date",
+        [
+            ("weekly", "2020-04-27"),
+            ("quarterly", "2020-04-01"),
+            ("yearly", "2020"),
+        ],
+    )
+    @mock.patch("urllib3.PoolManager.request")
+    def test_format_numpy_typed_periods(
+        self, mock_request, total: str, date: str
+    ) -> None:
+        # Arrange
+        numpy = pytest.importorskip("numpy", reason="NumPy is not installed")
+        package = "pip"
+        mocked_response = SAMPLE_RESPONSE_OVERALL
+
+        # Act
+        mock_request.return_value = mock_urllib3_response(mocked_response)
+        output = pypistats.overall(package, total=total, format="numpy-typed")
+
+        # Assert
+        # Weeks and quarters are the day they start
+        assert list(output["date"]) == [numpy.datetime64(date)] * 2
+        assert list(output["downloads"]) == [3587357, 3559451]
+
+    @mock.patch("urllib3.PoolManager.request")
+    def test_format_pandas_typed(self, mock_request) -> None:
+        # Arrange
+        pandas = pytest.importorskip("pandas", reason="pandas is not installed")
+        package = "pip"
+        mocked_response = SAMPLE_RESPONSE_OVERALL
+
+        # Act
+        mock_request.return_value = mock_urllib3_response(mocked_response)
+        output = pypistats.overall(package, total="monthly", format="pandas-typed")
+
+        # Assert
+        assert list(output.columns) == ["category", "date", "percent", "downloads"]
+        assert isinstance(output["category"].dtype, pandas.CategoricalDtype)
+        assert output["date"].dtype.kind == "M"
+        assert list(output["date"]) == [pandas.Timestamp("2020-05-01")] * 2
+        assert list(output["percent"]) == pytest.approx([100.0, 3559451 / 35873.57])
+        assert output["downloads"].dtype == "int64"
+        assert list(output["downloads"]) == [3587357, 3559451]
+
+    @pytest.mark.parametrize("format_", ["numpy-typed", "pandas-typed"])
+    @mock.patch("urllib3.PoolManager.request")
+    def test_format_typed_no_data_in_dates(self, mock_request, format_: str) -> None:
+        # Arrange
+        pytest.importorskip("pandas", reason="pandas is not installed")
+        package = "pip"
+        mocked_response = SAMPLE_RESPONSE_OVERALL
+
+        # Act
+        mock_request.return_value = mock_urllib3_response(mocked_response)
+        output = pypistats.overall(
+            package, start_date="2020-06-01", total="daily", format=format_
+        )
+
+        # Assert
+        assert len(output) == 0
+        if format_ == "numpy-typed":
+            assert output.dtype.names == ("category", "date", "downloads")
+            assert output.dtype["date"].kind == "M"
+        else:
+            assert list(output.columns) == ["category", "date", "downloads"]
+            assert output["date"].dtype.kind == "M"
+        assert output["downloads"].dtype == "int64"
+
+    @mock.patch("urllib3.PoolManager.request")
+    def test_format_arrow(self, mock_request) -> None:
+        # Arrange
+        pyarrow = pytest.importorskip("pyarrow", reason="pyarrow is not installed")
+        package = "pip"
+        mocked_response = SAMPLE_RESPONSE_OVERALL
+
+        # Act
+        mock_request.return_value = mock_urllib3_response(mocked_response)
+        output = pypistats.overall(package, total="monthly", format="arrow")
+
+        # Assert
+        assert output.schema.types == [
+            pyarrow.dictionary(pyarrow.int32(), pyarrow.string()),
+            pyarrow.date32(),
+            pyarrow.int64(),
+        ]
+        assert output.schema.metadata == {
+            b"package": b"pip",
+            b"type": b"overall_downloads",
+        }
+        # Like JSON, not sorted and no total row
+        assert output.to_pylist() == [
+            {
+                "category": "with_mirrors",
+                "date": dt.date(2020, 5, 1),
+                "downloads": 3587357,
+            },
+            {
+                "category": "without_mirrors",
+                "date": dt.date(2020, 5, 1),
+                "downloads": 3559451,
+            },
+        ]
+
+    @pytest.mark.parametrize(
+        "total, date",
+        [
+            ("weekly", dt.date(2020, 4, 27)),
+            ("quarterly", dt.date(2020, 4, 1)),
+            ("yearly", dt.date(2020, 1, 1)),
+        ],
+    )
+    @mock.patch("urllib3.PoolManager.request")
+    def test_format_arrow_periods(
+        self, mock_request, total: str, date: dt.date
+    ) -> None:
+        # Arrange
+        pytest.importorskip("pyarrow", reason="pyarrow is not installed")
+        package = "pip"
+        mocked_response = SAMPLE_RESPONSE_OVERALL
+
+        # Act
+        mock_request.return_value = mock_urllib3_response(mocked_response)
+        output = pypistats.overall(package, total=total, format="arrow")
+
+        # Assert
+        assert output.column("date").to_pylist() == [date, date]
+
+    @mock.patch("urllib3.PoolManager.request")
+    def test_format_parquet(self, mock_request) -> None:
+        # Arrange
+        pytest.importorskip("pyarrow", reason="pyarrow is not installed")
+        import pyarrow.parquet
+
+        package = "pip"
+        mocked_response = SAMPLE_RESPONSE_OVERALL
+
+        # Act
+        mock_request.return_value = mock_urllib3_response(mocked_response)
+        output = pypistats.overall(package, total="daily", format="parquet")
+
+        # Assert
+        assert output.startswith(b"PAR1")
+        table = pyarrow.parquet.read_table(pyarrow.BufferReader(output))
+        assert table.column("downloads").to_pylist() == [
+            2100139,
+            1487218,
+            2083472,
+            1475979,
+        ]
+
+    @pytest.mark.parametrize("format_", ["arrow", "parquet"])
+    @mock.patch("urllib3.PoolManager.request")
+    def test_format_arrow_no_data_in_dates(self, mock_request, format_: str) -> None:
+        # Arrange
+        pytest.importorskip("pyarrow", reason="pyarrow is not installed")
+        import pyarrow.parquet
+
+        package = "pip"
+        mocked_response = SAMPLE_RESPONSE_OVERALL
+
+        # Act
+        mock_request.return_value = mock_urllib3_response(mocked_response)
+        output = pypistats.overall(
+            package, start_date="2020-06-01", total="all", format=format_
+        )
+
+        # Assert
+        if format_ == "parquet":
+            output = pyarrow.parquet.read_table(pyarrow.BufferReader(output))
+        assert output.num_rows == 0
+        assert output.schema.names == ["category", "downloads"]
+        assert output.schema.field("downloads").type == pyarrow.int64()
+
+    def test_format_arrow_recent(self) -> None:
+        # Arrange
+        pytest.importorskip("pyarrow", reason="pyarrow is not installed")
+        res = {"data": dict(SAMPLE_DATA_RECENT), "package": "pip", "type": "recent"}
+
+        # Act
+        output = pypistats._process(res, format="arrow")
+
+        # Assert
+        assert output.to_pylist() == [SAMPLE_DATA_RECENT]
+
+    def test__typed_recent(self) -> None:
+        # Arrange
+        pytest.importorskip("pandas", reason="pandas is not installed")
+        data = copy.deepcopy(SAMPLE_DATA_RECENT)
+
+        # Act
+        output = pypistats._typed(data, "pandas-typed")
+
+        # Assert
+        assert list(output.columns) == ["last_day", "last_month", "last_week"]
+        assert output.to_dict("records") == [SAMPLE_DATA_RECENT]
+
+    @mock.patch("urllib3.PoolManager.request")
     def test_format_none(self, mock_request) -> None:
         # Arrange
         package = "pip"
@@ -903,7 +1155,7 @@ Date range: 2020-05-01 - 2020-05-01
             mock_request, "https://pypistats.org/api/packages/pip/overall"
         )
 
-    @mock.patch("urllib3.request")
+    @mock.patch("urllib3.PoolManager.request")
     def test_package_not_exist(self, mock_request) -> None:
         # Arrange
         package = "a" * 100
@@ -924,3 +1176,122 @@ Date range: 2020-05-01 - 2020-05-01
             mock_request,
             f"https://pypistats.org/api/packages/{package}/python_major",
         )
+
+    def test_client_reused(self) -> None:
+        # Arrange
+        client = mock.Mock(spec=pypistats.Client)
+        client.get.return_value = mock_urllib3_response(SAMPLE_RESPONSE_OVERALL)
+
+        # Act
+        pypistats.overall("pip", format=None, client=client)
+        pypistats.python_major("pip", format=None, client=client)
+
+        # Assert
+        assert [c.args for c in client.get.call_args_list] == [
+            ("https://pypistats.org/api/packages/pip/overall",),
+            ("https://pypistats.org/api/packages/pip/python_major",),
+        ]
+
+    @mock.patch("urllib3.PoolManager.request")
+    def test_fetch_many(self, mock_request) -> None:
+        # Arrange
+        def respond(method, url, headers):
+            if "does-not-exist" in url:
+                return mock_urllib3_response("Not Found", status=404)
+            return mock_urllib3_response(SAMPLE_RESPONSE_OVERALL)
+
+        mock_request.side_effect = respond
+        packages = ["pip", "does-not-exist", "pillow"]
+
+        # Act
+        results = {
+            result.package: result
+            for result in pypistats.fetch_many(packages, workers=2, format=None)
+        }
+
+        # Assert
+        assert sorted(results) == sorted(packages)
+        assert results["pip"].error is None
+        assert results["pip"].result[0]["downloads"] == 3587357
+        assert results["pillow"].error is None
+        assert results["does-not-exist"].result is None
+        assert "HTTP Error 404" in str(results["does-not-exist"].error)
+        assert mock_request.call_count == 3
+
+    def test_fetch_many_invalid_endpoint(self) -> None:
+        # Act / Assert
+        with pytest.raises(ValueError, match="endpoint must be one of"):
+            list(pypistats.fetch_many(["pip"], endpoint="nope"))
+
+    @mock.patch("urllib3.PoolManager.request")
+    def test_load(self, mock_request) -> None:
+        # Arrange
+        mock_request.return_value = mock_urllib3_response(SAMPLE_RESPONSE_OVERALL)
+
+        # Act
+        stats = pypistats.load("pip", "overall", mirrors=True)
+        daily = stats.daily
+        monthly = stats.monthly
+        all_time = stats.all_time
+        filtered = stats.view(format="json", start_date="2020-05-02", total="daily")
+
+        # Assert
+        assert_called_with_url(
+            mock_request, "https://pypistats.org/api/packages/pip/overall?&mirrors=true"
+        )
+        assert stats.package == "pip"
+        assert len(daily) == 5
+        assert monthly[0] == {
+            "category": "with_mirrors",
+            "date": "2020-05",
+            "downloads": 3587357,
+            "percent": "100.00%",
+        }
+        assert all_time == pypistats.overall("pip", mirrors=True, format=None)
+        assert len(json.loads(filtered)["data"]) == 2
+        # Views are memoized, and the raw data is untouched
+        assert stats.daily is daily
+        assert stats.raw == json.loads(SAMPLE_RESPONSE_OVERALL)
+
+    def test_load_invalid_param(self) -> None:
+        # Act / Assert
+        with pytest.raises(TypeError, match="overall only accepts 'mirrors'"):
+            pypistats.load("pip", "overall", version="3.7")
+
+    @mock.patch("urllib3.PoolManager.request")
+    def test_bundle(self, mock_request) -> None:
+        # Arrange
+        def respond(method, url, headers):
+            if url.endswith("/recent"):
+                return mock_urllib3_response(
+                    '{"data": {"last_day": 1}, "package": "pip", "type": "recent"}'
+                )
+            return mock_urllib3_response(SAMPLE_RESPONSE_OVERALL)
+
+        mock_request.side_effect = respond
+
+        # Act
+        stats = pypistats.bundle("pip")
+
+        # Assert
+        assert list(stats) == list(pypistats.ENDPOINTS)
+        assert sorted(c.args[1] for c in mock_request.call_args_list) == [
+            f"https://pypistats.org/api/packages/pip/{endpoint}"
+            for endpoint in sorted(pypistats.ENDPOINTS)
+        ]
+        assert stats["recent"].view() == {"last_day": 1}
+        assert stats["system"].all_time[-1]["downloads"] == 3587357
+
+    @mock.patch("urllib3.PoolManager.request")
+    def test_memory_cache_not_changed_by_processing(self, mock_request) -> None:
+        # Arrange
+        mock_request.return_value = mock_urllib3_response(SAMPLE_RESPONSE_OVERALL)
+        first = pypistats.overall("pip", total="daily", format=None)
+
+        # Act
+        second = pypistats.overall("pip", total="daily", format=None)
+
+        # Assert
+        assert mock_request.call_count == 1
+        assert first == second
+        assert "percent" not in pypistats.load("pip").raw["data"][0]
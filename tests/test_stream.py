@@ -0,0 +1,156 @@
+"""
+Unit tests for streaming responses
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+from typing import Any
+from unittest import mock
+
+import pytest
+
+import pypistats
+from pypistats import _stream
+
+from .data.python_minor import DATA as PYTHON_MINOR_DATA
+
+URL = "https://pypistats.org/api/packages/pip/python_minor"
+
+
+def chunked(content: bytes, size: int) -> list[bytes]:
+    return [content[i : i + size] for i in range(0, len(content), size)]
+
+
+def mock_streamed_response(content: str, status: int = 200) -> mock.Mock:
+    """Helper to create a mock urllib3 response to stream in small chunks"""
+    response = mock.Mock()
+    response.status = status
+    response.stream.return_value = chunked(content.encode(), 100)
+    return response
+
+
+RESPONSE = {"data": PYTHON_MINOR_DATA, "package": "pip", "type": "python_minor"}
+
+
+class TestResponse:
+    @pytest.mark.parametrize("size", [1, 3, 64, 10_000])
+    @pytest.mark.parametrize(
+        "res",
+        [
+            RESPONSE,
+            {"package": "pip", "data": PYTHON_MINOR_DATA[:5], "type": "x"},
+            {"data": [], "package": "pip", "type": "x"},
+            {"data": {"last_day": 1, "last_week": 12}, "package": "pip"},
+            {"data": [{"category": "ünïcödé 🐍", "downloads": 1234567890}]},
+            # Not where rows end
+            {"data": [{"category": "},", "a": {"b": 1}, "c": 2}, {"category": "x"}]},
+        ],
+    )
+    @pytest.mark.parametrize("indent", [None, 2])
+    def test_same_as_json(self, size: int, res: dict, indent: int | None) -> None:
+        # Arrange
+        content = json.dumps(res, indent=indent, ensure_ascii=False).encode()
+
+        # Act
+        response = _stream.Response(chunked(content, size))
+        rows = list(response)
+
+        # Assert
+        if isinstance(res["data"], list):
+            assert rows == res["data"]
+            assert response.nrows == len(rows)
+            assert response.fields == {**res, "data": None}
+        else:
+            assert rows == []
+            assert response.fields == res
+
+    @pytest.mark.parametrize(
+        "content", ['{"data": [{"a": 1}', '{"data": [{"a": 1}} ]}', "[]", ""]
+    )
+    def test_invalid(self, content: str) -> None:
+        # Arrange
+        response = _stream.Response(chunked(content.encode(), 4))
+
+        # Act / Assert
+        with pytest.raises(json.JSONDecodeError):
+            list(response)
+
+
+class TestStream:
+    @pytest.mark.parametrize(
+        "total", ["all", "daily", "weekly", "monthly", "quarterly", "yearly"]
+    )
+    @pytest.mark.parametrize(
+        "start_date, end_date",
+        [(None, None), ("2018-09-01", None), (None, "2018-09-30"), ("2018-04", None)],
+    )
+    @pytest.mark.parametrize("format", [None, "json", "markdown"])
+    @mock.patch("urllib3.PoolManager.request")
+    def test_same_as_not_streamed(
+        self,
+        mock_request: mock.Mock,
+        total: str,
+        start_date: str | None,
+        end_date: str | None,
+        format: str | None,
+        recwarn: pytest.WarningsRecorder,
+    ) -> None:
+        # Arrange
+        mock_request.return_value = mock_streamed_response(json.dumps(RESPONSE))
+        kwargs: dict[str, Any] = {
+            "format": format,
+            "start_date": start_date,
+            "end_date": end_date,
+            "total": total,
+        }
+        expected = pypistats._process(copy.deepcopy(RESPONSE), **kwargs)
+
+        # Act
+        with mock.patch.object(pypistats, "_load_cache", return_value=None):
+            output = pypistats.python_minor("pip", stream=True, **kwargs)
+
+        # Assert
+        assert output == expected
+        mock_request.assert_called_once_with(
+            "GET", URL, headers=mock.ANY, preload_content=False
+        )
+        mock_request.return_value.release_conn.assert_called_once_with()
+
+    @mock.patch("urllib3.PoolManager.request")
+    def test_not_cached(self, mock_request: mock.Mock) -> None:
+        # Arrange
+        mock_request.return_value = mock_streamed_response(json.dumps(RESPONSE))
+
+        # Act
+        with (
+            mock.patch.object(pypistats, "_load_cache", return_value=None),
+            mock.patch.object(pypistats, "_save_cache") as mock_save_cache,
+        ):
+            pypistats.python_minor("pip", stream=True)
+
+        # Assert
+        mock_save_cache.assert_not_called()
+
+    @mock.patch("urllib3.PoolManager.request")
+    def test_http_error(self, mock_request: mock.Mock) -> None:
+        # Arrange
+        import urllib3
+
+        mock_request.return_value = mock_streamed_response("Not found", status=404)
+
+        # Act
+        with (
+            mock.patch.object(pypistats, "_load_cache", return_value=None),
+            pytest.raises(urllib3.exceptions.HTTPError, match="HTTP Error 404"),
+        ):
+            pypistats.python_minor("pip", stream=True)
+
+        # Assert
+        mock_request.return_value.release_conn.assert_called_once_with()
+
+    def test_with_history(self) -> None:
+        # Act / Assert
+        with pytest.raises(ValueError, match="stream can't be used with history"):
+            pypistats.python_minor("pip", stream=True, history=True)